@@ -0,0 +1,394 @@
+# -*- coding: ISO-8859-15 -*-
+# =============================================================================
+# OWSLib. Copyright (C) 2014 OWSLib contributors
+#
+# Contact email: tomkralidis@gmail.com
+# =============================================================================
+
+"""
+Client side caches for OWS responses.
+
+CapabilitiesCache keeps GetCapabilities documents in memory (and optionally
+in a SQLite file) so that constructing a service object does not download
+and reparse multi-megabyte documents on every process start.  Once
+installed with set_capabilities_cache it is used by the capabilities
+readers of all services:
+
+    >>> from owslib.cache import CapabilitiesCache, set_capabilities_cache
+    >>> set_capabilities_cache(CapabilitiesCache(ttl=3600))
+    >>> wms = WebMapService(url)  # doctest: +SKIP
+    >>> set_capabilities_cache(None)
+
+TileCache is a persistent tile store backed by a single SQLite file (in the
+spirit of MBTiles), shared by WebMapTileService and TileMapService:
+
+    >>> from owslib.cache import TileCache
+    >>> cache = TileCache(':memory:', max_size=1024 * 1024)
+    >>> wmts = WebMapTileService(url, tile_cache=cache)  # doctest: +SKIP
+
+Tiles are keyed by (service url, layer, style, tile matrix set, tile matrix,
+row, column, format).  Entries older than max_age are revalidated with a
+conditional request (If-None-Match / If-Modified-Since), and the least
+recently used tiles are evicted once the store grows beyond max_size bytes.
+
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import httplib
+import sqlite3
+import threading
+import time
+from StringIO import StringIO
+from urllib2 import HTTPError
+
+from owslib.util import sniff_root, _EXCEPTION_ROOTS
+
+
+# content types of service exception reports, which are never cached
+_EXCEPTION_TYPES = ('application/vnd.ogc.se_xml', 'text/xml', 'application/xml')
+
+_capabilities_cache = None
+
+
+class CachedResponse(StringIO, object):
+    """File-like object returned for a response served from a cache"""
+
+    def __init__(self, content, url=None, headers=None):
+        super(CachedResponse, self).__init__(content)
+        self.url = url
+        self.code = 200
+        lines = ['%s: %s' % (name, value)
+                 for name, value in (headers or {}).items()
+                 if value is not None]
+        self.headers = httplib.HTTPMessage(StringIO('\r\n'.join(lines + ['', ''])))
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+
+def validators(entry):
+    """Return the conditional request headers for a cached entry.
+
+    entry is a dict holding (optional) 'etag' and 'last_modified' values.
+    """
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def _is_stale(entry, max_age):
+    return max_age is not None and time.time() - entry['fetched'] > max_age
+
+
+class TileCache(object):
+    """Persistent tile store backed by a SQLite file
+
+    Parameters
+    ----------
+
+    - path: SQLite database file (default is ':memory:')
+    - max_size: maximum total size of the stored tiles in bytes (default is 512MB)
+    - max_entries: optional maximum number of stored tiles
+    - max_age: seconds after which a tile is revalidated with the server
+      (default is one day, None never revalidates)
+
+    """
+
+    _KEY_COLUMNS = ('service', 'layer', 'style', 'tilematrixset',
+                    'tilematrix', 'tilerow', 'tilecol', 'format')
+
+    def __init__(self, path=':memory:', max_size=512 * 1024 * 1024,
+                 max_entries=None, max_age=86400):
+        self.path = path
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.text_factory = str
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS tiles ('
+            'service TEXT, layer TEXT, style TEXT, tilematrixset TEXT, '
+            'tilematrix TEXT, tilerow INTEGER, tilecol INTEGER, format TEXT, '
+            'tile_data BLOB, content_type TEXT, etag TEXT, last_modified TEXT, '
+            'size INTEGER, fetched REAL, last_access REAL, '
+            'PRIMARY KEY (service, layer, style, tilematrixset, tilematrix, '
+            'tilerow, tilecol, format))')
+        self._db.execute('CREATE INDEX IF NOT EXISTS tiles_last_access '
+                         'ON tiles (last_access)')
+        self._db.commit()
+
+    def _where(self):
+        return ' AND '.join('%s = ?' % c for c in self._KEY_COLUMNS)
+
+    def _normalize(self, key):
+        if len(key) != len(self._KEY_COLUMNS):
+            raise ValueError('tile key must be a %d-tuple %s' %
+                             (len(self._KEY_COLUMNS), self._KEY_COLUMNS))
+        return tuple('' if k is None else k for k in key)
+
+    def get(self, key):
+        """Return the cached entry for key as a dict, or None"""
+        key = self._normalize(key)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT tile_data, content_type, etag, last_modified, fetched '
+                'FROM tiles WHERE ' + self._where(), key).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE tiles SET last_access = ? WHERE ' +
+                             self._where(), (time.time(),) + key)
+            self._db.commit()
+        entry = dict(zip(('data', 'content_type', 'etag', 'last_modified',
+                          'fetched'), row))
+        entry['data'] = str(entry['data'])
+        return entry
+
+    def put(self, key, data, content_type=None, etag=None, last_modified=None):
+        """Store a tile, evicting least recently used tiles if needed"""
+        key = self._normalize(key)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO tiles VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                key + (sqlite3.Binary(data), content_type, etag,
+                       last_modified, len(data), now, now))
+            self._evict()
+            self._db.commit()
+
+    def touch(self, key):
+        """Mark a tile as fresh after a successful revalidation"""
+        key = self._normalize(key)
+        now = time.time()
+        with self._lock:
+            self._db.execute('UPDATE tiles SET fetched = ?, last_access = ? '
+                             'WHERE ' + self._where(), (now, now) + key)
+            self._db.commit()
+
+    def _evict(self):
+        size, count = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM tiles').fetchone()
+        while ((self.max_size is not None and size > self.max_size) or
+               (self.max_entries is not None and count > self.max_entries)):
+            row = self._db.execute('SELECT rowid, size FROM tiles '
+                                   'ORDER BY last_access LIMIT 1').fetchone()
+            if row is None:
+                break
+            self._db.execute('DELETE FROM tiles WHERE rowid = ?', (row[0],))
+            size -= row[1]
+            count -= 1
+
+    def clear(self):
+        """Remove all stored tiles"""
+        with self._lock:
+            self._db.execute('DELETE FROM tiles')
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM tiles').fetchone()[0]
+
+    def fetch(self, key, opener, url=None):
+        """Return the tile for key, from the store or from the network.
+
+        opener is called with a dict of extra request headers and must
+        return the (urllib2 style) response; it is only called when the
+        tile is missing or stale.  Service exception reports are returned
+        as is and never stored.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            if not _is_stale(entry, self.max_age):
+                return self._response(entry, url)
+            try:
+                u = opener(validators(entry))
+            except HTTPError as err:
+                if err.code != 304:
+                    raise
+                self.touch(key)
+                return self._response(entry, url)
+        else:
+            u = opener({})
+
+        headers = u.headers
+        content_type = headers.get('Content-Type')
+        if (content_type or '').split(';')[0].strip().lower() in _EXCEPTION_TYPES:
+            return u
+        data = u.read()
+        entry = {'data': data, 'content_type': content_type,
+                 'etag': headers.get('ETag'),
+                 'last_modified': headers.get('Last-Modified')}
+        self.put(key, data, entry['content_type'], entry['etag'],
+                 entry['last_modified'])
+        return self._response(entry, url or getattr(u, 'url', None))
+
+    def _response(self, entry, url):
+        return CachedResponse(entry['data'], url, {
+            'Content-Type': entry['content_type'],
+            'ETag': entry['etag'],
+            'Last-Modified': entry['last_modified']})
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _key(url, username):
+    """Return the cache key of a document fetched by username (or anonymously)"""
+    if username is None:
+        return url
+    return '%s@%s' % (username, url)
+
+
+class CapabilitiesCache(object):
+    """Cache of GetCapabilities documents keyed by request URL (and user name
+    for authenticated requests)
+
+    Exception reports are never cached.
+
+    Parameters
+    ----------
+
+    - ttl: seconds during which a document is used without contacting the
+      server (default is 3600, None never revalidates); older documents are
+      revalidated with If-None-Match/If-Modified-Since
+    - path: optional SQLite file persisting the documents across processes
+
+    """
+
+    def __init__(self, ttl=3600, path=None):
+        self.ttl = ttl
+        self.path = path
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.text_factory = str
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS capabilities ('
+                'url TEXT PRIMARY KEY, content BLOB, etag TEXT, '
+                'last_modified TEXT, fetched REAL)')
+            self._db.commit()
+
+    def get(self, url):
+        """Return the cached entry for url as a dict, or None"""
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    'SELECT content, etag, last_modified, fetched '
+                    'FROM capabilities WHERE url = ?', (url,)).fetchone()
+                if row is not None:
+                    entry = dict(zip(('content', 'etag', 'last_modified',
+                                      'fetched'), row))
+                    entry['content'] = str(entry['content'])
+                    self._memory[url] = entry
+        return entry
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Store the capabilities document fetched from url"""
+        entry = {'content': content, 'etag': etag,
+                 'last_modified': last_modified, 'fetched': time.time()}
+        with self._lock:
+            self._memory[url] = entry
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO capabilities VALUES (?, ?, ?, ?, ?)',
+                    (url, sqlite3.Binary(content), etag, last_modified,
+                     entry['fetched']))
+                self._db.commit()
+
+    def touch(self, url):
+        """Mark the document for url as fresh after a revalidation"""
+        now = time.time()
+        with self._lock:
+            if url in self._memory:
+                self._memory[url]['fetched'] = now
+            if self._db is not None:
+                self._db.execute('UPDATE capabilities SET fetched = ? '
+                                 'WHERE url = ?', (now, url))
+                self._db.commit()
+
+    def seed(self, url, filename):
+        """Store the document saved in filename as the response for url"""
+        with open(filename, 'rb') as f:
+            self.put(url, f.read())
+
+    def invalidate(self, url=None):
+        """Forget the document for url, or all documents"""
+        with self._lock:
+            if url is None:
+                self._memory.clear()
+                if self._db is not None:
+                    self._db.execute('DELETE FROM capabilities')
+            else:
+                self._memory.pop(url, None)
+                if self._db is not None:
+                    self._db.execute('DELETE FROM capabilities WHERE url = ?',
+                                     (url,))
+            if self._db is not None:
+                self._db.commit()
+
+    def fetch(self, url, opener, username=None):
+        """Return the capabilities document for url as a string.
+
+        opener is called with a dict of extra request headers and must
+        return the (urllib2 style) response; it is only called when the
+        document is missing or older than ttl.  Documents fetched with
+        credentials are cached per username.  Exception reports are returned
+        without being cached.
+        """
+        key = _key(url, username)
+        entry = self.get(key)
+        if entry is not None:
+            if not _is_stale(entry, self.ttl):
+                return entry['content']
+            try:
+                u = opener(validators(entry))
+            except HTTPError as err:
+                if err.code != 304:
+                    raise
+                self.touch(key)
+                return entry['content']
+        else:
+            u = opener({})
+        content = u.read()
+        headers = u.headers
+        if sniff_root(CachedResponse(content))[0] in _EXCEPTION_ROOTS:
+            return content
+        self.put(key, content, headers.get('ETag'),
+                 headers.get('Last-Modified'))
+        return content
+
+
+def get_capabilities_cache():
+    """Return the capabilities cache used by the readers, or None"""
+    return _capabilities_cache
+
+
+def set_capabilities_cache(cache):
+    """Install cache (a CapabilitiesCache, or None to disable caching)"""
+    global _capabilities_cache
+    _capabilities_cache = cache
+
+
+def read_capabilities(url, opener, username=None):
+    """Return the capabilities document for url as a string.
+
+    The installed capabilities cache is used if there is one, otherwise
+    opener (called with a dict of extra request headers) is simply read.
+    username is the user the document is requested for, if any.
+    """
+    cache = _capabilities_cache
+    if cache is None:
+        return opener({}).read()
+    return cache.fetch(url, opener, username)
@@ -13,7 +13,7 @@ from __future__ import (absolute_import, division, print_function)
 
 from owslib.coverage.wcsBase import WCSBase, WCSCapabilitiesReader, ServiceException
 from urllib import urlencode
-from owslib.util import openURL, testXMLValue
+from owslib.util import openURL, testXMLValue, OperationTable
 from owslib.etree import etree
 from owslib.crs import Crs
 import os, errno
@@ -36,12 +36,13 @@ class WebCoverageService_1_0_0(WCSBase):
         else:
             raise KeyError("No content named %s" % name)
     
-    def __init__(self,url,xml, cookies):
+    def __init__(self,url,xml, cookies, session=None):
         self.version='1.0.0'
         self.url = url   
         self.cookies=cookies
+        self.session=session
         # initialize from saved capability document or access the server
-        reader = WCSCapabilitiesReader(self.version, self.cookies)
+        reader = WCSCapabilitiesReader(self.version, self.cookies, self.session)
         if xml:
             self._capabilities = reader.readString(xml)
         else:
@@ -66,6 +67,7 @@ class WebCoverageService_1_0_0(WCSBase):
         self.operations=[]
         for elem in self._capabilities.find(ns('Capability/')+ns('Request'))[:]:
             self.operations.append(OperationMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
           
         #serviceContents metadata
         self.contents={}
@@ -113,10 +115,7 @@ class WebCoverageService_1_0_0(WCSBase):
         if log.isEnabledFor(logging.DEBUG):
             log.debug('WCS 1.0.0 DEBUG: Parameters passed to GetCoverage: identifier=%s, bbox=%s, time=%s, format=%s, crs=%s, width=%s, height=%s, resx=%s, resy=%s, resz=%s, parameter=%s, method=%s, other_arguments=%s'%(identifier, bbox, time, format, crs, width, height, resx, resy, resz, parameter, method, str(kwargs)))
                 
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetCoverage').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetCoverage', method, default=self.url)
         
         if log.isEnabledFor(logging.DEBUG):
             log.debug('WCS 1.0.0 DEBUG: base url of server: %s'%base_url)
@@ -157,7 +156,7 @@ class WebCoverageService_1_0_0(WCSBase):
             log.debug('WCS 1.0.0 DEBUG: Second part of URL: %s'%data)
         
         
-        u=openURL(base_url, data, method, self.cookies)
+        u=openURL(base_url, data, method, self.cookies, session=self.session)
 
         return u
     
@@ -165,10 +164,7 @@ class WebCoverageService_1_0_0(WCSBase):
                
     def getOperationByName(self, name):
         """Return a named operation item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
 
 class OperationMetadata(object):
@@ -14,7 +14,7 @@
 from __future__ import (absolute_import, division, print_function)
 
 from .wcsBase import WCSBase, WCSCapabilitiesReader, ServiceException
-from owslib.util import openURL, testXMLValue
+from owslib.util import openURL, testXMLValue, OperationTable
 from urllib import urlencode
 from urllib2 import urlopen
 from owslib.etree import etree
@@ -40,12 +40,13 @@ class WebCoverageService_1_1_0(WCSBase):
         else:
             raise KeyError("No content named %s" % name)
     
-    def __init__(self,url,xml, cookies):
+    def __init__(self,url,xml, cookies, session=None):
         self.version='1.1.0'
         self.url = url   
         self.cookies=cookies
+        self.session=session
         # initialize from saved capability document or access the server
-        reader = WCSCapabilitiesReader(self.version)
+        reader = WCSCapabilitiesReader(self.version, self.cookies, self.session)
         if xml:
             self._capabilities = reader.readString(xml)
         else:
@@ -72,12 +73,13 @@ class WebCoverageService_1_1_0(WCSBase):
                 
         #serviceOperations
         self.operations = []
-        for elem in self._capabilities.findall('{http://www.opengis.net/wcs/1.1/ows}OperationsMetadata/{http://www.opengis.net/wcs/1.1/ows}Operation/'):
+        for elem in self._capabilities.findall('{http://www.opengis.net/wcs/1.1/ows}OperationsMetadata/{http://www.opengis.net/wcs/1.1/ows}Operation'):
             self.operations.append(Operation(elem))
         
         # exceptions - ***********TO DO *************
             self.exceptions = [f.text for f \
                 in self._capabilities.findall('Capability/Exception/Format')]
+        self._operation_table = OperationTable(self.operations)
               
         # serviceContents: our assumption is that services use a top-level layer
         # as a metadata organizer, nothing more.
@@ -142,10 +144,7 @@ class WebCoverageService_1_1_0(WCSBase):
         
         if method == 'Get':
             method='{http://www.opengis.net/wcs/1.1/ows}Get'
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetCoverage').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetCoverage', method, default=self.url)
 
 
         #process kwargs
@@ -184,16 +183,13 @@ class WebCoverageService_1_1_0(WCSBase):
         #encode and request
         data = urlencode(request)
         
-        u=openURL(base_url, data, method, self.cookies)
+        u=openURL(base_url, data, method, self.cookies, session=self.session)
         return u
         
         
     def getOperationByName(self, name):
         """Return a named operation item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
         
 class Operation(object):
     """Abstraction for operation metadata    
@@ -12,7 +12,9 @@
 from __future__ import (absolute_import, division, print_function)
 
 from urllib import urlencode
-from urllib2 import urlopen, Request
+from urllib2 import Request
+from owslib.transport import get_session
+from owslib.cache import read_capabilities
 from owslib.etree import etree
 import cgi
 from StringIO import StringIO
@@ -35,17 +37,19 @@ class ServiceException(Exception):
 
 class WCSBase(object):
     """Base class to be subclassed by version dependent WCS classes. Provides 'high-level' version independent methods"""
-    def __new__(self,url, xml, cookies):
+    def __new__(self,url, xml, cookies, session=None):
         """ overridden __new__ method 
         
         @type url: string
         @param url: url of WCS capabilities document
         @type xml: string
         @param xml: elementtree object
+        @type session: owslib.transport.Session
+        @param session: HTTP session used for all requests (default session if None)
         @return: inititalised WCSBase object
         """
         obj=object.__new__(self)
-        obj.__init__(url, xml, cookies)
+        obj.__init__(url, xml, cookies, session)
         self.cookies=cookies
         self._describeCoverage = {} #cache for DescribeCoverage responses
         return obj
@@ -56,7 +60,7 @@ class WCSBase(object):
     def getDescribeCoverage(self, identifier):
         ''' returns a describe coverage document - checks the internal cache to see if it has been fetched before '''
         if identifier not in self._describeCoverage.keys():
-            reader = DescribeCoverageReader(self.version, identifier, self.cookies)
+            reader = DescribeCoverageReader(self.version, identifier, self.cookies, self.session)
             self._describeCoverage[identifier] = reader.read(self.url)
         return self._describeCoverage[identifier]
         
@@ -65,7 +69,7 @@ class WCSCapabilitiesReader(object):
     """Read and parses WCS capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version=None, cookies = None):
+    def __init__(self, version=None, cookies = None, session=None):
         """Initialize
         @type version: string
         @param version: WCS Version parameter e.g '1.0.0'
@@ -73,6 +77,7 @@ class WCSCapabilitiesReader(object):
         self.version = version
         self._infoset = None
         self.cookies = cookies
+        self.session = session
 
     def capabilities_url(self, service_url):
         """Return a capabilities url
@@ -108,11 +113,12 @@ class WCSCapabilitiesReader(object):
         @return: An elementtree tree representation of the capabilities document
         """
         request = self.capabilities_url(service_url)
-        req = Request(request)
-        if self.cookies is not None:
-            req.add_header('Cookie', self.cookies)   
-        u = urlopen(req, timeout=timeout)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            req = Request(request, headers=headers)
+            if self.cookies is not None:
+                req.add_header('Cookie', self.cookies)   
+            return (self.session or get_session()).open(req, timeout=timeout)
+        return etree.fromstring(read_capabilities(request, opener))
     
     def readString(self, st):
         """Parse a WCS capabilities document, returning an
@@ -127,7 +133,7 @@ class DescribeCoverageReader(object):
     """Read and parses WCS DescribeCoverage document into a lxml.etree infoset
     """
 
-    def __init__(self, version, identifier, cookies):
+    def __init__(self, version, identifier, cookies, session=None):
         """Initialize
         @type version: string
         @param version: WCS Version parameter e.g '1.0.0'
@@ -136,6 +142,7 @@ class DescribeCoverageReader(object):
         self._infoset = None
         self.identifier=identifier
         self.cookies = cookies
+        self.session = session
 
     def descCov_url(self, service_url):
         """Return a describe coverage url
@@ -184,7 +191,7 @@ class DescribeCoverageReader(object):
         req = Request(request)
         if self.cookies is not None:
             req.add_header('Cookie', self.cookies)   
-        u = urlopen(req, timeout=timeout)
+        u = (self.session or get_session()).open(req, timeout=timeout)
         return etree.fromstring(u.read())
     
        
@@ -12,12 +12,12 @@
 from __future__ import (absolute_import, division, print_function)
 
 import base64
-import inspect
+import copy
 import warnings
 import StringIO
 import random
 from urllib import urlencode
-from urllib2 import Request, urlopen
+from urllib2 import Request
 
 from owslib.util import OrderedDict
 
@@ -30,6 +30,8 @@ from owslib.fgdc import Metadata
 from owslib.dif import DIF
 from owslib.namespaces import Namespaces
 from owslib.util import cleanup_namespaces, bind_url, add_namespaces
+from owslib.transport import get_session, run_async
+from owslib.cache import read_capabilities
 
 # default variables
 outputformat = 'application/xml'
@@ -44,7 +46,7 @@ schema_location = '%s %s' % (namespaces['csw'], schema)
 class CatalogueServiceWeb:
     """ csw request class """
     def __init__(self, url, lang='en-US', version='2.0.2', timeout=10, skip_caps=False,
-                 username=None, password=None):
+                 username=None, password=None, session=None):
         """
 
         Construct and process a GetCapabilities request
@@ -59,6 +61,7 @@ class CatalogueServiceWeb:
         - skip_caps: whether to skip GetCapabilities processing on init (default is False)
         - username: username for HTTP basic authentication
         - password: password for HTTP basic authentication
+        - session: owslib.transport.Session to share pooled connections (default session if None)
 
         """
 
@@ -68,6 +71,7 @@ class CatalogueServiceWeb:
         self.timeout = timeout
         self.username = username
         self.password = password
+        self.session = session
         self.service = 'CSW'
         self.exceptionreport = None
         self.owscommon = ows.OwsCommon('1.0.0')
@@ -79,7 +83,7 @@ class CatalogueServiceWeb:
 
             self.request = '%s%s' % (bind_url(self.url), urlencode(data))
     
-            self._invoke()
+            self._invoke('GetCapabilities', cacheable=True)
     
             if self.exceptionreport is None:
                 # ServiceIdentification
@@ -92,6 +96,7 @@ class CatalogueServiceWeb:
                 self.operations=[]
                 for elem in self._exml.findall(util.nspath_eval('ows:OperationsMetadata/ows:Operation', namespaces)):
                     self.operations.append(ows.OperationsMetadata(elem, self.owscommon.namespace))
+                self._operation_table = util.OperationTable(self.operations)
         
                 # FilterCapabilities
                 val = self._exml.find(util.nspath_eval('ogc:Filter_Capabilities', namespaces))
@@ -121,7 +126,7 @@ class CatalogueServiceWeb:
 
         self.request = node0
 
-        self._invoke()
+        self._invoke('DescribeRecord')
 
         # parse result
         # TODO: process the XML Schema (you're on your own for now with self.response)
@@ -151,7 +156,7 @@ class CatalogueServiceWeb:
 
         self.request = node0
 
-        self._invoke()
+        self._invoke('GetDomain')
 
         if self.exceptionreport is None:
             self.results = {}
@@ -232,7 +237,7 @@ class CatalogueServiceWeb:
     
             self.request = node0
 
-        self._invoke()
+        self._invoke('GetRecords')
  
         if self.exceptionreport is None:
             self.results = {}
@@ -278,7 +283,7 @@ class CatalogueServiceWeb:
 
         self.request = '%s%s' % (bind_url(self.url), urlencode(data))
 
-        self._invoke()
+        self._invoke('GetRecordById')
 
         if self.exceptionreport is None:
             self.results = {}
@@ -307,6 +312,56 @@ class CatalogueServiceWeb:
 
         """
 
+        esn = self._getrecordsrequest(constraints, sortby, typenames, esn, outputschema, format, startposition, maxrecords, cql, xml, resulttype)
+
+        self._invoke('GetRecords')
+ 
+        if self.exceptionreport is None:
+            self.results = {}
+    
+            # process search results attributes
+            self._parsesearchresults(self._exml.find(util.nspath_eval('csw:SearchResults', namespaces)))
+
+            # process list of matching records
+            self.records = OrderedDict()
+
+            self._parserecords(outputschema, esn)
+
+    def getrecords2_stream(self, constraints=[], sortby=None, typenames='csw:Record', esn='summary', outputschema=namespaces['csw'], format=outputformat, startposition=0, maxrecords=10, cql=None, xml=None, resulttype='results', lazy=False):
+        """
+
+        Construct and process a GetRecords request, yielding the records one
+        at a time while the response is read
+
+        The response is parsed incrementally: every record is built as soon
+        as its element has been read, then released from the document, so
+        neither the response nor the whole result set is held in memory.
+        self.results is set once csw:SearchResults has been read;
+        self.response, self._exml and self.records are not set.
+
+        Parameters
+        ----------
+
+        See getrecords2, plus
+
+        - lazy: parse the sections of ISO records on first access (see owslib.iso.MD_Metadata, default is False)
+
+        """
+
+        esn = self._getrecordsrequest(constraints, sortby, typenames, esn, outputschema, format, startposition, maxrecords, cql, xml, resulttype)
+
+        self.results = {}
+
+        response = self._invoke('GetRecords', stream=True)
+        try:
+            for record in self._iterparserecords(response, outputschema, esn, lazy):
+                yield record
+        finally:
+            response.close()
+
+    def _getrecordsrequest(self, constraints, sortby, typenames, esn, outputschema, format, startposition, maxrecords, cql, xml, resulttype):
+        """ Set self.request to a GetRecords request, returning the ElementSetName """
+
         if xml is not None:
             self.request = etree.fromstring(xml)
             val = self.request.find(util.nspath_eval('csw:Query/csw:ElementSetName', namespaces))
@@ -350,30 +405,120 @@ class CatalogueServiceWeb:
 
             self.request = node0
 
-        self._invoke()
- 
-        if self.exceptionreport is None:
-            self.results = {}
-    
-            # process search results attributes
-            val = self._exml.find(util.nspath_eval('csw:SearchResults', namespaces)).attrib.get('numberOfRecordsMatched')
-            self.results['matches'] = int(util.testXMLValue(val, True))
-            val = self._exml.find(util.nspath_eval('csw:SearchResults', namespaces)).attrib.get('numberOfRecordsReturned')
-            self.results['returned'] = int(util.testXMLValue(val, True))
-            val = self._exml.find(util.nspath_eval('csw:SearchResults', namespaces)).attrib.get('nextRecord')
-            if val is not None:
-                 self.results['nextrecord'] = int(util.testXMLValue(val, True))
-            else:
-                warnings.warn("""CSW Server did not supply a nextRecord value (it is optional), so the client
-                should page through the results in another way.""")
-                # For more info, see:
-                # https://github.com/geopython/OWSLib/issues/100
-                self.results['nextrecord'] = None
+        return esn
 
-            # process list of matching records
-            self.records = OrderedDict()
+    def _parsesearchresults(self, elem):
+        """ Set self.results from the attributes of csw:SearchResults """
 
-            self._parserecords(outputschema, esn)
+        val = elem.attrib.get('numberOfRecordsMatched')
+        self.results['matches'] = int(util.testXMLValue(val, True))
+        val = elem.attrib.get('numberOfRecordsReturned')
+        self.results['returned'] = int(util.testXMLValue(val, True))
+        val = elem.attrib.get('nextRecord')
+        if val is not None:
+            self.results['nextrecord'] = int(util.testXMLValue(val, True))
+        else:
+            warnings.warn("""CSW Server did not supply a nextRecord value (it is optional), so the client
+            should page through the results in another way.""")
+            # For more info, see:
+            # https://github.com/geopython/OWSLib/issues/100
+            self.results['nextrecord'] = None
+
+    def getrecords2_async(self, *args, **kwargs):
+        """
+
+        Run getrecords2 in the background, returning a multiprocessing.pool.AsyncResult
+
+        The request is processed by a copy of this object so that several
+        requests can run at the same time; the result of the AsyncResult is
+        that copy, holding the records, results and exceptionreport.
+
+        """
+
+        csw = copy.copy(self)
+
+        def getrecords2():
+            csw.getrecords2(*args, **kwargs)
+            return csw
+
+        return run_async(getrecords2)
+
+    def iterrecords(self, pagesize=10, startposition=0, maxrecords=None, prefetch=0, **kwargs):
+        """
+
+        Page through the result set of a GetRecords request, yielding the
+        records (CswRecord, MD_Metadata, ...) one at a time
+
+        Pages of pagesize records are requested with getrecords2, following
+        nextRecord until the result set is exhausted.  Every page is
+        processed by a copy of this object, so self.records and self.results
+        are left untouched.
+
+        Parameters
+        ----------
+
+        - pagesize: the number of records requested per page (default is 10)
+        - startposition: position of the first record (default is 0, the start of the result set)
+        - maxrecords: the maximum number of records returned over all pages (default is all)
+        - prefetch: the number of pages fetched concurrently once the first page has reported the number of matches (default is 0, pages are fetched one after another)
+        - **kwargs: other getrecords2 parameters (constraints, sortby, typenames, esn, outputschema, ...)
+
+        """
+
+        # CSW positions are 1-based; 0 leaves startPosition out of the request
+        first = max(startposition, 1)
+
+        def fetch(start):
+            size = pagesize
+            if maxrecords is not None:
+                size = min(size, first + maxrecords - start)
+            csw = copy.copy(self)
+            csw.getrecords2(startposition=start, maxrecords=size, **kwargs)
+            return csw
+
+        def nextstart(csw, start):
+            """ position of the page following the page at start """
+            nextrecord = csw.results['nextrecord']
+            if nextrecord is None:  # not reported, assume a contiguous result set
+                nextrecord = start + len(csw.records)
+            return nextrecord
+
+        start = first
+        csw = fetch(start)
+        for record in csw.records.values():
+            yield record
+        end = csw.results['matches'] + 1
+        if maxrecords is not None:
+            end = min(end, first + maxrecords)
+        # servers may return fewer records than requested per page
+        step = len(csw.records)
+        start = nextstart(csw, start)
+
+        while len(csw.records) > 0 and 0 < start < end:
+            if prefetch <= 0:
+                page = start
+                csw = fetch(page)
+                for record in csw.records.values():
+                    yield record
+                start = nextstart(csw, page)
+                continue
+
+            # fetch the next pages concurrently, assuming they hold step
+            # records each, and yield them in order; the nextRecord of every
+            # page is checked and paging restarts from it if they do not
+            pages = range(start, end, step)[:prefetch]
+            done = {}
+            for page, result, error in util.iter_concurrently(fetch, pages, prefetch):
+                done[page] = (result, error)
+            for page in pages:
+                csw, error = done[page]
+                if error is not None:
+                    raise error
+                for record in csw.records.values():
+                    yield record
+                start = nextstart(csw, page)
+                if len(csw.records) == 0 or start != page + step:
+                    break
 
     def transaction(self, ttype=None, typename='csw:Record', record=None, propertyname=None, propertyvalue=None, bbox=None, keywords=[], cql=None, identifier=None):
         """
@@ -396,10 +541,99 @@ class CatalogueServiceWeb:
         """
 
         # construct request
+        node0 = self._settransactionroot()
+        self._settransactionaction(node0, ttype, typename, record, propertyname, propertyvalue, bbox, keywords, cql, identifier)
+
+        self.request = node0
+
+        self._invoke('Transaction')
+        self.results = {}
+
+        if self.exceptionreport is None:
+            self._parsetransactionsummary()
+            self._parseinsertresult()
+
+    def transaction_batch(self, operations, batchsize=100, max_workers=4):
+        """
+
+        Construct and process Transaction requests holding many operations
+
+        operations are grouped into csw:Transaction documents of up to
+        batchsize actions, which are submitted concurrently.  The
+        TransactionSummary and InsertResult of every response are aggregated
+        in self.results:
+
+        - inserted, updated, deleted: total number of records
+        - insertresults: identifiers of the inserted records, in the order of operations
+        - requestids: requestId of every response
+        - errors: list of (index of the first operation of the batch, exception)
+          for every batch which failed; the other batches are still submitted
+
+        Parameters
+        ----------
+
+        - operations: iterable of dicts of transaction keyword arguments, e.g. {'ttype': 'insert', 'record': xml}
+        - batchsize: maximum number of actions per Transaction request (default is 100)
+        - max_workers: number of requests submitted concurrently (default is 4)
+
+        """
+
+        def batches():
+            batch = []
+            start = 0
+            for operation in operations:
+                batch.append(operation)
+                if len(batch) >= batchsize:
+                    yield start, batch
+                    start += len(batch)
+                    batch = []
+            if batch:
+                yield start, batch
+
+        self.results = {'inserted': 0, 'updated': 0, 'deleted': 0,
+                        'insertresults': [], 'requestids': [], 'errors': []}
+        done = {}
+        for (start, batch), results, error in util.iter_concurrently(
+                lambda item: copy.copy(self)._transactionbatch(item[1]), batches(), max_workers):
+            if error is not None:
+                self.results['errors'].append((start, error))
+                continue
+            done[start] = results
+
+        for start in sorted(done):
+            results = done[start]
+            for key in ['inserted', 'updated', 'deleted']:
+                self.results[key] += results.get(key) or 0
+            self.results['insertresults'].extend(results['insertresults'])
+            if results.get('requestid') is not None:
+                self.results['requestids'].append(results['requestid'])
+        self.results['errors'].sort(key=lambda e: e[0])
+
+    def _transactionbatch(self, operations):
+        """ Send a Transaction request holding many actions, returning its results """
+
+        node0 = self._settransactionroot()
+        for operation in operations:
+            self._settransactionaction(node0, **operation)
+
+        self.request = node0
+
+        self._invoke('Transaction')
+        self.results = {}
+
+        self._parsetransactionsummary()
+        self._parseinsertresult()
+        return self.results
+
+    def _settransactionroot(self):
         node0 = self._setrootelement('csw:Transaction')
         node0.set('version', self.version)
         node0.set('service', self.service)
         node0.set(util.nspath_eval('xsi:schemaLocation', namespaces), schema_location)
+        return node0
+
+    def _settransactionaction(self, node0, ttype=None, typename='csw:Record', record=None, propertyname=None, propertyvalue=None, bbox=None, keywords=[], cql=None, identifier=None):
+        """ Append an Insert, Update or Delete action to a Transaction request """
 
         validtransactions = ['insert', 'update', 'delete']
 
@@ -424,20 +658,11 @@ class CatalogueServiceWeb:
                     node2 = etree.SubElement(node1, util.nspath_eval('csw:RecordProperty', namespaces))
                     etree.SubElement(node2, util.nspath_eval('csw:Name', namespaces)).text = propertyname
                     etree.SubElement(node2, util.nspath_eval('csw:Value', namespaces)).text = propertyvalue
-                    self._setconstraint(node1, qtype, propertyname, keywords, bbox, cql, identifier)
+                    self._setconstraint(node1, None, propertyname, keywords, bbox, cql, identifier)
 
         if ttype == 'delete':
             self._setconstraint(node1, None, propertyname, keywords, bbox, cql, identifier)
 
-        self.request = node0
-
-        self._invoke()
-        self.results = {}
-
-        if self.exceptionreport is None:
-            self._parsetransactionsummary()
-            self._parseinsertresult()
-
     def harvest(self, source, resourcetype, resourceformat=None, harvestinterval=None, responsehandler=None):
         """
 
@@ -470,7 +695,7 @@ class CatalogueServiceWeb:
        
         self.request = node0
 
-        self._invoke()
+        self._invoke('Harvest')
         self.results = {}
 
         if self.exceptionreport is None:
@@ -486,10 +711,7 @@ class CatalogueServiceWeb:
 
     def get_operation_by_name(self, name):
         """Return a named operation"""
-        for item in self.operations:
-            if item.name.lower() == name.lower():
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name, case_sensitive=False)
 
     def getService_urls(self, service_string=None):
         """
@@ -540,6 +762,63 @@ class CatalogueServiceWeb:
                 identifier = self._setidentifierkey(util.testXMLValue(val))
                 self.records[identifier] = CswRecord(i)
 
+    def _recordtags(self, outputschema, esn):
+        """ Return the tags of the record elements for an outputSchema """
+        if outputschema == namespaces['gmd']: # iso 19139
+            return (util.nspath_eval('gmd:MD_Metadata', namespaces), util.nspath_eval('gmi:MI_Metadata', namespaces))
+        elif outputschema == namespaces['fgdc']: # fgdc csdgm
+            return ('metadata',)
+        elif outputschema == namespaces['dif']: # nasa dif
+            return (util.nspath_eval('dif:DIF', namespaces),)
+        else: # process default
+            return (util.nspath_eval('csw:%s' % self._setesnel(esn), namespaces),)
+
+    def _iterparserecords(self, source, outputschema, esn, lazy=False):
+        """ Yield the records of a GetRecords response as their elements close """
+        tags = self._recordtags(outputschema, esn)
+        searchresults = util.nspath_eval('csw:SearchResults', namespaces)
+        exceptionreport = util.nspath_eval('ows:ExceptionReport', namespaces)
+        root = None
+        stack = []
+        inside = 0  # depth of nested record elements
+        for event, elem in etree.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                    if root.tag not in (util.nspath_eval('csw:GetRecordsResponse', namespaces), exceptionreport):
+                        raise RuntimeError('Document is XML, but not CSW-ish')
+                elif elem.tag == searchresults:
+                    self._parsesearchresults(elem)
+                if elem.tag in tags:
+                    inside += 1
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            if elem.tag not in tags:
+                continue
+            inside -= 1
+            if inside > 0:
+                continue
+            if outputschema == namespaces['gmd']:
+                record = MD_Metadata(elem, lazy=lazy)
+            elif outputschema == namespaces['fgdc']:
+                record = Metadata(elem)
+            elif outputschema == namespaces['dif']:
+                record = DIF(elem)
+            else:
+                record = CswRecord(elem)
+            # release the record element; lazy records keep their own subtree
+            if not lazy:
+                elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+            yield record
+
+        if root is not None and root.tag == exceptionreport:
+            raise ows.ExceptionReport(root, self.owscommon.namespace)
+        self.exceptionreport = None
+
     def _parsetransactionsummary(self):
         val = self._exml.find(util.nspath_eval('csw:TransactionSummary', namespaces))
         if val is not None:
@@ -589,37 +868,32 @@ class CatalogueServiceWeb:
                 flt = fes.FilterRequest()
                 node0.append(flt.set(qtype=qtype, keywords=keywords, propertyname=propertyname,bbox=bbox))
     
-    def _invoke(self):
-        # do HTTP request
+    def _invoke(self, operation, cacheable=False, stream=False):
+        # do HTTP request for the named operation (e.g. 'GetRecords')
+        # cacheable GET responses (GetCapabilities) go through the capabilities cache
+        # stream=True returns the open response, which the caller parses
 
         if isinstance(self.request, basestring):  # GET KVP
-            req = Request(self.request)
-            if self.username is not None and self.password is not None:
-                base64string = base64.encodestring('%s:%s' % (self.username, self.password))[:-1]
-                req.add_header('Authorization', 'Basic %s' % base64string)
-            self.response = urlopen(req, timeout=self.timeout).read()
+            def opener(headers):
+                req = Request(self.request, headers=headers)
+                if self.username is not None and self.password is not None:
+                    base64string = base64.encodestring('%s:%s' % (self.username, self.password))[:-1]
+                    req.add_header('Authorization', 'Basic %s' % base64string)
+                session = self.session or get_session()
+                return session.open(req, timeout=self.timeout)
+            if stream:
+                return opener({})
+            if cacheable:
+                self.response = read_capabilities(self.request, opener, self.username)
+            else:
+                self.response = opener({}).read()
         else:
-            xml_post_url = self.url
             # Get correct POST URL based on Operation list.
-            # If skip_caps=True, then self.operations has not been set, so use
+            # If skip_caps=True, then there is no operation table, so use
             # default URL.
-            if hasattr(self, 'operations'):
-                caller = inspect.stack()[1][3] 
-                if caller == 'getrecords2': caller = 'getrecords'
-                try:
-                    op = self.get_operation_by_name(caller)
-                    post_verbs = filter(lambda x: x.get('type').lower() == 'post', op.methods)
-                    if len(post_verbs) > 1:
-                        # Filter by constraints.  We must match a PostEncoding of "XML"
-                        try:
-                            xml_post_url = next(x for x in filter(list, ([pv.get('url') for const in pv.get('constraints') if const.name.lower() == "postencoding" and 'xml' in map(lambda x: x.lower(), const.values)] for pv in post_verbs)))[0]
-                        except StopIteration:
-                            # Well, just use the first one.
-                            xml_post_url = post_verbs[0].get('url')
-                    elif len(post_verbs) == 1:
-                        xml_post_url = post_verbs[0].get('url')
-                except:  # no such luck, just go with xml_post_url
-                    pass
+            xml_post_url = self.url
+            if hasattr(self, '_operation_table'):
+                xml_post_url = self._operation_table.url(operation, 'Post', 'XML', default=self.url)
 
             self.request = cleanup_namespaces(self.request)
             # Add any namespaces used in the "typeNames" attribute of the
@@ -634,7 +908,12 @@ class CatalogueServiceWeb:
 
             self.request = util.element_to_string(self.request, encoding='utf-8')
 
-            self.response = util.http_post(xml_post_url, self.request, self.lang, self.timeout, self.username, self.password)
+            if stream:
+                return util.http_post(xml_post_url, self.request, self.lang, self.timeout, self.username, self.password,
+                                      session=self.session, stream=True)
+
+            self.response = util.http_post(xml_post_url, self.request, self.lang, self.timeout, self.username, self.password,
+                                           session=self.session)
 
         # parse result see if it's XML
         self._exml = etree.parse(StringIO.StringIO(self.response))
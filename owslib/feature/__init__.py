@@ -9,9 +9,37 @@ from __future__ import (absolute_import, division, print_function)
 
 from owslib.crs import Crs
 
+from cStringIO import StringIO
 from urllib import urlencode
 import logging
-from owslib.util import log
+from owslib.etree import etree
+from owslib.util import log, iter_concurrently
+from owslib.transport import run_async
+
+
+def _root_attribute(page, names):
+    """Return the first integer attribute of names found on the root
+    element of a GetFeature response, or None.  Only the start of the
+    document is parsed."""
+    try:
+        for event, elem in etree.iterparse(page, events=('start',)):
+            for name in names:
+                value = elem.get(name)
+                if value is not None and value.isdigit():
+                    return int(value)
+            return None
+    except Exception:
+        return None
+
+
+def _quadrants(bbox):
+    """Split (minx, miny, maxx, maxy[, srs]) into its four quadrants"""
+    minx, miny, maxx, maxy = bbox[:4]
+    midx, midy = (minx + maxx) / 2.0, (miny + maxy) / 2.0
+    srs = tuple(bbox[4:])
+    return [(minx, miny, midx, midy) + srs, (midx, miny, maxx, midy) + srs,
+            (minx, midy, midx, maxy) + srs, (midx, midy, maxx, maxy) + srs]
+
 
 class WebFeatureService_(object):
     """Base class for WebFeatureService implementations"""
@@ -76,9 +104,198 @@ class WebFeatureService_(object):
                          Options are: %s. " % (srs.getcode(), typename, options))
             return None
 
+    def getfeaturecount(self, typename=None, filter=None, bbox=None, **kwargs):
+        """Return the number of features matched by a GetFeature request.
+
+        The count is requested with resultType=hits (WFS 1.1.0 and 2.0.0);
+        None is returned when the server does not report it.  Parameters
+        are those of getfeature.
+        """
+        u = self.getfeature(typename=typename, filter=filter, bbox=bbox,
+                            resulttype='hits', **kwargs)
+        try:
+            return _root_attribute(u, ('numberMatched', 'numberOfFeatures'))
+        finally:
+            u.close()
+
+    def getfeature_async(self, *args, **kwargs):
+        """Run getfeature in the background, returning a multiprocessing.pool.AsyncResult"""
+        return run_async(self.getfeature, *args, **kwargs)
+
+    def iterfeatures(self, typename=None, filter=None, bbox=None, pagesize=1000,
+                     startindex=0, maxfeatures=None, max_workers=1, parse=None,
+                     **kwargs):
+        """Page through the result set of a GetFeature request.
+
+        The size of the result set is first requested with resultType=hits,
+        then pages of pagesize features are requested with startindex and
+        maxfeatures (WFS 1.1.0 and 2.0.0).  Pages are yielded in order as
+        file-like objects, or, when parse is given, the items returned by
+        parse(page) are yielded for every page.
+
+        Parameters
+        ----------
+        typename, filter, bbox, **kwargs :
+            GetFeature parameters, see getfeature.
+        pagesize : int
+            Number of features requested per page (default is 1000).
+        startindex : int
+            Position of the first feature (default is 0).
+        maxfeatures : int
+            Maximum number of features returned over all pages.
+        max_workers : int
+            Number of pages fetched concurrently (default is 1).  Pages
+            fetched concurrently are read into memory.
+        parse : callable
+            Optional function taking a page and returning its features,
+            such as owslib.feature.gml.parse_features.
+
+        When the server does not report the number of matched features the
+        pages are requested one after another until a page holds fewer than
+        pagesize features.
+        """
+        query = dict(kwargs, typename=typename, filter=filter, bbox=bbox)
+        total = self.getfeaturecount(**query)
+
+        def fetch(start, size, buffered):
+            page = self.getfeature(startindex=start, maxfeatures=size, **query)
+            if parse is not None:
+                return list(parse(page))
+            if buffered:
+                return StringIO(page.read())
+            return page
+
+        def results(result):
+            if parse is None:
+                yield result
+            else:
+                for feature in result:
+                    yield feature
+
+        if total is None:
+            start = startindex
+            while maxfeatures is None or start < startindex + maxfeatures:
+                size = pagesize
+                if maxfeatures is not None:
+                    size = min(size, startindex + maxfeatures - start)
+                result = fetch(start, size, True)
+                if parse is None:
+                    returned = _root_attribute(result, ('numberReturned', 'numberOfFeatures'))
+                    result.seek(0)
+                else:
+                    returned = len(result)
+                if returned is None:
+                    log.warning('GetFeature page at %d does not report the '
+                                'number of features, paging stopped' % start)
+                for item in results(result):
+                    yield item
+                if not returned or returned < size:
+                    break
+                start += returned
+            return
+
+        end = total
+        if maxfeatures is not None:
+            end = min(end, startindex + maxfeatures)
+        starts = range(startindex, end, pagesize)
+
+        if max_workers <= 1:
+            for start in starts:
+                for item in results(fetch(start, min(pagesize, end - start), False)):
+                    yield item
+            return
+
+        # fetch windows of pages concurrently, yielding them in order
+        window = 2 * max_workers
+        for i in range(0, len(starts), window):
+            done = {}
+            for start, result, error in iter_concurrently(
+                    lambda s: fetch(s, min(pagesize, end - s), True),
+                    starts[i:i + window], max_workers):
+                done[start] = (result, error)
+            for start in starts[i:i + window]:
+                result, error = done[start]
+                if error is not None:
+                    raise error
+                for item in results(result):
+                    yield item
+
+    def iterbboxfeatures(self, typename, bbox, max_hits=1000, max_depth=6,
+                         max_workers=4, parse=None, **kwargs):
+        """Fetch the features in a large bounding box with concurrent requests.
+
+        bbox is split into a quadtree: every quadrant whose resultType=hits
+        count exceeds max_hits is split again, up to max_depth levels.  The
+        quadrants are then requested concurrently and their features are
+        yielded as they arrive.  Features straddling quadrant borders are
+        returned by several requests and are yielded only once, by feature
+        id (WFS 1.1.0 and 2.0.0).
+
+        Parameters
+        ----------
+        typename : list
+            List of typenames (string)
+        bbox : tuple
+            (left, bottom, right, top[, srs]), see getfeature.
+        max_hits : int
+            Largest number of features requested at once (default is 1000);
+            quadrants still holding more at max_depth are paged.
+        max_depth : int
+            Maximum number of subdivisions (default is 6).
+        max_workers : int
+            Number of concurrent requests (default is 4).
+        parse : callable
+            Function taking a GetFeature response and returning features
+            with an id attribute (default is owslib.feature.gml.parse_features).
+        **kwargs :
+            Other getfeature parameters.
+        """
+        if parse is None:
+            from owslib.feature.gml import parse_features as parse
+        query = dict(kwargs, typename=typename)
+
+        def count(box):
+            return self.getfeaturecount(bbox=box, **query)
+
+        # count the features of every quadrant, one level at a time
+        leaves = []
+        level = [tuple(bbox)]
+        for depth in range(max_depth + 1):
+            subdivided = []
+            for box, hits, error in iter_concurrently(count, level, max_workers):
+                if error is not None:
+                    raise error
+                if hits == 0:
+                    continue
+                if hits is not None and hits > max_hits and depth < max_depth:
+                    subdivided.extend(_quadrants(box))
+                else:
+                    leaves.append((box, hits))
+            if not subdivided:
+                break
+            level = subdivided
+
+        def fetch(leaf):
+            box, hits = leaf
+            if hits is not None and hits > max_hits:
+                return list(self.iterfeatures(bbox=box, pagesize=max_hits,
+                                              parse=parse, **query))
+            return list(parse(self.getfeature(bbox=box, **query)))
+
+        seen = set()
+        for leaf, features, error in iter_concurrently(fetch, leaves, max_workers):
+            if error is not None:
+                raise error
+            for feature in features:
+                if feature.id is not None:
+                    if feature.id in seen:
+                        continue
+                    seen.add(feature.id)
+                yield feature
+
     def getGETGetFeatureRequest(self, typename=None, filter=None, bbox=None, featureid=None,
                    featureversion=None, propertyname=None, maxfeatures=None,storedQueryID=None, storedQueryParams={},
-                   outputFormat=None, method='Get', startindex=None):
+                   outputFormat=None, method='Get', startindex=None, resulttype=None):
         """Formulate proper GetFeature request using KVP encoding
         ----------
         typename : list
@@ -101,6 +318,8 @@ class WebFeatureService_(object):
             Requested response format of the request.
         startindex: int (optional)
             Start position to return feature set (paging in combination with maxfeatures)
+        resulttype: string (optional)
+            'results' (default) or 'hits' to only request the number of features
 
         There are 3 different modes of use
 
@@ -109,7 +328,7 @@ class WebFeatureService_(object):
         3) featureid (direct access to known features)
         """
 
-        base_url = next((m.get('url') for m in self.getOperationByName('GetFeature').methods if m.get('type').lower() == method.lower()))
+        base_url = self._operation_table.url('GetFeature', method, default=self.url)
         base_url = base_url if base_url.endswith("?") else base_url+"?"
             
         request = {'service': 'WFS', 'version': self.version, 'request': 'GetFeature'}
@@ -132,6 +351,8 @@ class WebFeatureService_(object):
             request['maxfeatures'] = str(maxfeatures)
         if startindex:
             request['startindex'] = str(startindex)
+        if resulttype is not None:
+            request['resultType'] = resulttype
         if storedQueryID: 
             request['storedQuery_id']=str(storedQueryID)
             for param in storedQueryParams:
@@ -0,0 +1,219 @@
+# -*- coding: ISO-8859-15 -*-
+# =============================================================================
+# OWSLib. Copyright (C) 2014 OWSLib contributors
+#
+# Contact email: tomkralidis@gmail.com
+# =============================================================================
+
+"""
+Streaming parser for GML feature collections returned by WFS GetFeature.
+
+parse_features walks the response with iterparse and yields one Feature at
+a time; the elements of a feature are released as soon as it has been
+yielded, so memory use does not grow with the size of the response:
+
+    >>> from owslib.feature.gml import parse_features
+    >>> response = wfs.getfeature(typename=['topp:states'])  # doctest: +SKIP
+    >>> for feature in parse_features(response):  # doctest: +SKIP
+    ...     print(feature.id, feature.properties['STATE_NAME'])
+
+Geometries are returned GeoJSON-like, as a dict with 'type', 'srsName' and
+'coordinates' (nested lists of coordinate tuples, in the axis order of the
+document).
+
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+from owslib.etree import etree
+from owslib.namespaces import Namespaces
+from owslib.util import ServiceException, xmltag_split
+
+n = Namespaces()
+GML_NAMESPACES = (n.get_namespace('gml'), n.get_namespace('gml32'))
+WFS_NAMESPACES = (n.get_namespace('wfs'), n.get_namespace('wfs20'))
+
+# elements holding the features of a collection
+_MEMBER_TAGS = ('featureMember', 'featureMembers', 'member')
+
+# elements holding coordinates
+_POSITION_TAGS = ('pos', 'posList', 'coordinates', 'coord',
+                  'lowerCorner', 'upperCorner')
+
+_EXCEPTION_TAGS = ('ServiceExceptionReport', 'ExceptionReport')
+
+
+class Feature(object):
+    """A feature read from a GML feature collection
+
+    Attributes
+    ----------
+
+    - id: gml:id (or fid) of the feature
+    - typename: qualified name of the feature type, as {namespace}name
+    - properties: dict of property values by name; properties with complex
+      content are dicts themselves, geometry properties are geometry dicts
+    - geometry: the first geometry property (a dict), or None
+    - geometry_name: name of the geometry property, or None
+
+    """
+
+    def __init__(self, id, typename, properties, geometry=None, geometry_name=None):
+        self.id = id
+        self.typename = typename
+        self.properties = properties
+        self.geometry = geometry
+        self.geometry_name = geometry_name
+
+    def __repr__(self):
+        return '<Feature %s of %s>' % (self.id, xmltag_split(self.typename))
+
+
+def _namespace(tag):
+    if tag[0] == '{':
+        return tag[1:].split('}')[0]
+    return ''
+
+
+def _is_geometry(elem):
+    """GML geometry objects are UpperCamelCase elements in a GML namespace"""
+    return _namespace(elem.tag) in GML_NAMESPACES and xmltag_split(elem.tag)[:1].isupper()
+
+
+def _is_member(elem):
+    """featureMember, featureMembers or member of a feature collection"""
+    return xmltag_split(elem.tag) in _MEMBER_TAGS and \
+        _namespace(elem.tag) in GML_NAMESPACES + WFS_NAMESPACES
+
+
+def _children(elem):
+    return [child for child in elem if isinstance(child.tag, basestring)]
+
+
+def _dimension(elem, dim):
+    value = elem.get('srsDimension') or elem.get('dimension')
+    if value is not None and value.isdigit():
+        return int(value)
+    return dim
+
+
+def _positions(elem, dim):
+    """Return the list of coordinate tuples held by a position element"""
+    name = xmltag_split(elem.tag)
+    if name == 'coord':
+        values = dict((xmltag_split(c.tag), float(c.text)) for c in _children(elem))
+        return [tuple(values[axis] for axis in ('X', 'Y', 'Z') if axis in values)]
+    text = (elem.text or '').strip()
+    if not text:
+        return []
+    if name == 'coordinates':
+        cs, ts, decimal = elem.get('cs', ','), elem.get('ts', ' '), elem.get('decimal', '.')
+        return [tuple(float(v.replace(decimal, '.')) for v in tuple_.split(cs))
+                for tuple_ in text.split(ts) if tuple_]
+    values = [float(v) for v in text.split()]
+    if name != 'posList':
+        return [tuple(values)]
+    dim = _dimension(elem, dim)
+    return [tuple(values[i:i + dim]) for i in range(0, len(values), dim)]
+
+
+def _coordinates(elem, dim=2):
+    """Return the coordinates of a GML geometry element"""
+    dim = _dimension(elem, dim)
+    positions = []
+    parts = []
+    for child in _children(elem):
+        if xmltag_split(child.tag) in _POSITION_TAGS:
+            positions.extend(_positions(child, dim))
+        else:
+            parts.extend(_parts(child, dim))
+    if positions:
+        if xmltag_split(elem.tag) == 'Point':
+            return positions[0]
+        return positions
+    return parts
+
+
+def _parts(elem, dim):
+    """Return the coordinates of the geometries below a property element
+    (exterior, pointMember, surfaceMembers, ...) or a geometry element"""
+    if _is_geometry(elem):
+        return [_coordinates(elem, dim)]
+    parts = []
+    for child in _children(elem):
+        parts.extend(_parts(child, dim))
+    return parts
+
+
+def _geometry(elem):
+    """Return a geometry dict for a GML geometry element"""
+    return {'type': xmltag_split(elem.tag), 'srsName': elem.get('srsName'),
+            'coordinates': _coordinates(elem)}
+
+
+def _value(elem):
+    """Return the value of a feature property element"""
+    children = _children(elem)
+    if not children:
+        return elem.text
+    if len(children) == 1 and _is_geometry(children[0]):
+        return _geometry(children[0])
+    values = {}
+    for child in children:
+        values[xmltag_split(child.tag)] = _value(child)
+    return values
+
+
+def _feature(elem):
+    properties = {}
+    geometry = geometry_name = None
+    for child in _children(elem):
+        if _namespace(child.tag) in GML_NAMESPACES:  # gml:name, gml:boundedBy, ...
+            continue
+        name = xmltag_split(child.tag)
+        value = _value(child)
+        grandchildren = _children(child)
+        if geometry is None and len(grandchildren) == 1 and _is_geometry(grandchildren[0]):
+            geometry, geometry_name = value, name
+        else:
+            properties[name] = value
+    fid = elem.get('{%s}id' % GML_NAMESPACES[1]) or \
+        elem.get('{%s}id' % GML_NAMESPACES[0]) or elem.get('fid')
+    return Feature(fid, elem.tag, properties, geometry, geometry_name)
+
+
+def parse_features(source):
+    """Yield the features of a GML feature collection one at a time.
+
+    source is a file name or a file-like object, such as the response
+    returned by getfeature.  A ServiceException is raised if the response
+    is an exception report.
+    """
+    stack = []
+    root = None
+    for event, elem in etree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is None:
+            break
+        if _is_member(parent) and xmltag_split(elem.tag) != 'FeatureCollection' and \
+                all(_is_member(e) or xmltag_split(e.tag) == 'FeatureCollection'
+                    for e in stack):
+            feature = _feature(elem)
+            elem.clear()
+            parent.remove(elem)
+            yield feature
+        elif _is_member(elem):
+            # the features of this member have been yielded
+            elem.clear()
+            parent.remove(elem)
+
+    if root is not None and xmltag_split(root.tag) in _EXCEPTION_TAGS:
+        text = ' '.join(t.strip() for t in root.itertext() if t.strip())
+        raise ServiceException(text)
@@ -11,8 +11,11 @@ from __future__ import (absolute_import, division, print_function)
 import cgi
 from cStringIO import StringIO
 from urllib import urlencode
-from urllib2 import urlopen
-from owslib.util import openURL, testXMLValue, extract_xml_list, ServiceException, xmltag_split
+from urllib2 import urlopen, Request
+from owslib.transport import get_session, run_async
+from owslib.cache import read_capabilities
+from owslib.util import openURL, testXMLValue, extract_xml_list, ServiceException, xmltag_split, \
+    resolve_remote_metadata, OperationTable
 from owslib.etree import etree
 from owslib.fgdc import Metadata
 from owslib.iso import MD_Metadata
@@ -51,7 +54,7 @@ class WebFeatureService_1_0_0(object):
 
     Implements IWebFeatureService.
     """
-    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30):
+    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30, session=None):
         """ overridden __new__ method 
         
         @type url: string
@@ -61,10 +64,12 @@ class WebFeatureService_1_0_0(object):
         @type parse_remote_metadata: boolean
         @param parse_remote_metadata: whether to fully process MetadataURL elements
         @param timeout: time (in seconds) after which requests should timeout
+        @type session: owslib.transport.Session
+        @param session: HTTP session used for all requests (default session if None)
         @return: initialized WebFeatureService_1_0_0 object
         """
         obj=object.__new__(self)
-        obj.__init__(url, version, xml, parse_remote_metadata, timeout)
+        obj.__init__(url, version, xml, parse_remote_metadata, timeout, session)
         return obj
     
     def __getitem__(self,name):
@@ -75,13 +80,14 @@ class WebFeatureService_1_0_0(object):
             raise KeyError("No content named %s" % name)
     
     
-    def __init__(self, url, version, xml=None, parse_remote_metadata=False, timeout=30):
+    def __init__(self, url, version, xml=None, parse_remote_metadata=False, timeout=30, session=None):
         """Initialize."""
         self.url = url
         self.version = version
         self.timeout = timeout
+        self.session = session
         self._capabilities = None
-        reader = WFSCapabilitiesReader(self.version)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
         if xml:
             self._capabilities = reader.readString(xml)
         else:
@@ -102,6 +108,7 @@ class WebFeatureService_1_0_0(object):
         self.operations=[]
         for elem in self._capabilities.find(nspath('Capability/Request'))[:]:
             self.operations.append(OperationMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
                    
         #serviceContents metadata: our assumption is that services use a top-level 
         #layer as a metadata organizer, nothing more. 
@@ -110,8 +117,14 @@ class WebFeatureService_1_0_0(object):
         featuretypelist=self._capabilities.find(nspath('FeatureTypeList'))
         features = self._capabilities.findall(nspath('FeatureTypeList/FeatureType'))
         for feature in features:
-            cm=ContentMetadata(feature, featuretypelist, parse_remote_metadata)
+            cm=ContentMetadata(feature, featuretypelist)
             self.contents[cm.id]=cm       
+
+        # fetch the remote metadata of all feature types at once
+        if parse_remote_metadata:
+            resolve_remote_metadata(
+                [m for cm in self.contents.values() for m in cm.metadataUrls],
+                _parse_remote_metadata, timeout=self.timeout, session=self.session)
         
         #exceptions
         self.exceptions = [f.text for f \
@@ -121,8 +134,8 @@ class WebFeatureService_1_0_0(object):
         """Request and return capabilities document from the WFS as a 
         file-like object.
         NOTE: this is effectively redundant now"""
-        reader = WFSCapabilitiesReader(self.version)
-        return urlopen(reader.capabilities_url(self.url), timeout=self.timeout)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
+        return (self.session or get_session()).open(reader.capabilities_url(self.url), timeout=self.timeout)
     
     def items(self):
         '''supports dict-like items() access'''
@@ -169,10 +182,7 @@ class WebFeatureService_1_0_0(object):
         2) typename and filter (more expressive)
         3) featureid (direct access to known features)
         """
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetFeature').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetFeature', method, default=self.url)
         request = {'service': 'WFS', 'version': self.version, 'request': 'GetFeature'}
 
         # check featureid
@@ -200,7 +210,7 @@ class WebFeatureService_1_0_0(object):
 
         data = urlencode(request)
         log.debug("Making request: %s?%s" % (base_url, data))
-        u = openURL(base_url, data, method, timeout=self.timeout)
+        u = openURL(base_url, data, method, timeout=self.timeout, session=self.session)
         
         
         # check for service exceptions, rewrap, and return
@@ -235,12 +245,13 @@ class WebFeatureService_1_0_0(object):
                 return StringIO(data)
             return u
 
+    def getfeature_async(self, *args, **kwargs):
+        """Run getfeature in the background, returning a multiprocessing.pool.AsyncResult"""
+        return run_async(self.getfeature, *args, **kwargs)
+
     def getOperationByName(self, name):
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
 class ServiceIdentification(object):
     ''' Implements IServiceIdentificationMetadata '''
@@ -314,20 +325,12 @@ class ContentMetadata:
                 'url': testXMLValue(m)
             }
 
-            if metadataUrl['url'] is not None and parse_remote_metadata:  # download URL
-                try:
-                    content = urlopen(metadataUrl['url'], timeout=timeout)
-                    doc = etree.parse(content)
-                    if metadataUrl['type'] is not None:
-                        if metadataUrl['type'] == 'FGDC':
-                            metadataUrl['metadata'] = Metadata(doc)
-                        if metadataUrl['type'] == 'TC211':
-                            metadataUrl['metadata'] = MD_Metadata(doc)
-                except Exception:
-                    metadataUrl['metadata'] = None
-
             self.metadataUrls.append(metadataUrl)
 
+        if parse_remote_metadata:  # download URLs
+            resolve_remote_metadata(self.metadataUrls, _parse_remote_metadata,
+                                    max_workers=1, timeout=timeout)
+
 
 class OperationMetadata:
     """Abstraction for WFS metadata.
@@ -345,13 +348,22 @@ class OperationMetadata:
             self.methods.append({'type' : xmltag_split(verb.tag), 'url': url})
 
 
+def _parse_remote_metadata(metadataUrl, doc):
+    """Return the metadata object for a remote MetadataURL document"""
+    if metadataUrl['type'] == 'FGDC':
+        return Metadata(doc)
+    if metadataUrl['type'] == 'TC211':
+        return MD_Metadata(doc)
+
+
 class WFSCapabilitiesReader(object):
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='1.0'):
+    def __init__(self, version='1.0', session=None):
         """Initialize"""
         self.version = version
+        self.session = session
         self._infoset = None
 
     def capabilities_url(self, service_url):
@@ -385,8 +397,10 @@ class WFSCapabilitiesReader(object):
             A timeout value (in seconds) for the request.
         """
         request = self.capabilities_url(url)
-        u = urlopen(request, timeout=timeout)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return (self.session or get_session()).open(
+                Request(request, headers=headers), timeout=timeout)
+        return etree.fromstring(read_capabilities(request, opener))
 
     def readString(self, st):
         """Parse a WFS capabilities document, returning an
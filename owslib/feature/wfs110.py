@@ -12,8 +12,11 @@ from __future__ import (absolute_import, division, print_function)
 import cgi
 from cStringIO import StringIO
 from urllib import urlencode
-from urllib2 import urlopen
-from owslib.util import openURL, testXMLValue, nspath_eval, ServiceException
+from urllib2 import urlopen, Request
+from owslib.transport import get_session
+from owslib.cache import read_capabilities
+from owslib.util import openURL, testXMLValue, nspath_eval, ServiceException, resolve_remote_metadata, \
+    OperationTable
 from owslib.etree import etree
 from owslib.fgdc import Metadata
 from owslib.iso import MD_Metadata
@@ -34,7 +37,7 @@ class WebFeatureService_1_1_0(WebFeatureService_):
 
     Implements IWebFeatureService.
     """
-    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30):
+    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30, session=None):
         """ overridden __new__ method
 
         @type url: string
@@ -44,10 +47,12 @@ class WebFeatureService_1_1_0(WebFeatureService_):
         @type parse_remote_metadata: boolean
         @param parse_remote_metadata: whether to fully process MetadataURL elements
         @param timeout: time (in seconds) after which requests should timeout
+        @type session: owslib.transport.Session
+        @param session: HTTP session used for all requests (default session if None)
         @return: initialized WebFeatureService_1_1_0 object
         """
         obj=object.__new__(self)
-        obj.__init__(url, version, xml, parse_remote_metadata, timeout)
+        obj.__init__(url, version, xml, parse_remote_metadata, timeout, session)
         return obj
 
     def __getitem__(self,name):
@@ -58,14 +63,15 @@ class WebFeatureService_1_1_0(WebFeatureService_):
             raise KeyError("No content named %s" % name)
 
 
-    def __init__(self, url, version, xml=None, parse_remote_metadata=False, timeout=30):
+    def __init__(self, url, version, xml=None, parse_remote_metadata=False, timeout=30, session=None):
         """Initialize."""
         self.url = url
         self.version = version
         self.timeout = timeout
+        self.session = session
         self._capabilities = None
         self.owscommon = OwsCommon('1.0.0')
-        reader = WFSCapabilitiesReader(self.version)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
         if xml:
             self._capabilities = reader.readString(xml)
         else:
@@ -85,6 +91,7 @@ class WebFeatureService_1_1_0(WebFeatureService_):
         self.operations=[]
         for elem in self._capabilities.findall(util.nspath_eval('ows:OperationsMetadata/ows:Operation', namespaces)):
             self.operations.append(OperationsMetadata(elem, self.owscommon.namespace))
+        self._operation_table = OperationTable(self.operations)
 
         # FilterCapabilities
         val = self._capabilities.find(util.nspath_eval('ogc:Filter_Capabilities', namespaces))
@@ -96,9 +103,15 @@ class WebFeatureService_1_1_0(WebFeatureService_):
         self.contents={}
         features = self._capabilities.findall(nspath_eval('wfs:FeatureTypeList/wfs:FeatureType', namespaces))
         for feature in features:
-            cm=ContentMetadata(feature, parse_remote_metadata)
+            cm=ContentMetadata(feature)
             self.contents[cm.id]=cm
 
+        # fetch the remote metadata of all feature types at once
+        if parse_remote_metadata:
+            resolve_remote_metadata(
+                [m for cm in self.contents.values() for m in cm.metadataUrls],
+                _parse_remote_metadata, timeout=self.timeout, session=self.session)
+
         #exceptions
         self.exceptions = [f.text for f \
                 in self._capabilities.findall('Capability/Exception/Format')]
@@ -107,8 +120,8 @@ class WebFeatureService_1_1_0(WebFeatureService_):
         """Request and return capabilities document from the WFS as a
         file-like object.
         NOTE: this is effectively redundant now"""
-        reader = WFSCapabilitiesReader(self.version)
-        return urlopen(reader.capabilities_url(self.url), timeout=self.timeout)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
+        return (self.session or get_session()).open(reader.capabilities_url(self.url), timeout=self.timeout)
 
     def items(self):
         '''supports dict-like items() access'''
@@ -120,7 +133,7 @@ class WebFeatureService_1_1_0(WebFeatureService_):
     def getfeature(self, typename=None, filter=None, bbox=None, featureid=None,
                    featureversion=None, propertyname=['*'], maxfeatures=None,
                    srsname=None, outputFormat=None, method='Get',
-                   startindex=None):
+                   startindex=None, resulttype=None):
         """Request and return feature data as a file-like object.
 
         Parameters
@@ -147,6 +160,8 @@ class WebFeatureService_1_1_0(WebFeatureService_):
             Requested response format of the request.
         startindex: int (optional)
             Start position to return feature set (paging in combination with maxfeatures)
+        resulttype: string (optional)
+            'results' (default) or 'hits' to only request the number of features
 
         There are 3 different modes of use
 
@@ -155,10 +170,7 @@ class WebFeatureService_1_1_0(WebFeatureService_):
         2) typename and filter (more expressive)
         3) featureid (direct access to known features)
         """
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetFeature').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetFeature', method, default=self.url)
         request = {'service': 'WFS', 'version': self.version, 'request': 'GetFeature'}
 
         if not isinstance(typename, list):
@@ -205,10 +217,12 @@ class WebFeatureService_1_1_0(WebFeatureService_):
             request['startindex'] = str(startindex)
         if outputFormat is not None:
             request["outputFormat"] = outputFormat
+        if resulttype is not None:
+            request['resultType'] = resulttype
 
         data = urlencode(request)
         log.debug("Making request: %s?%s" % (base_url, data))
-        u = openURL(base_url, data, method, timeout=self.timeout)
+        u = openURL(base_url, data, method, timeout=self.timeout, session=self.session)
 
         # check for service exceptions, rewrap, and return
         # We're going to assume that anything with a content-length > 32k
@@ -243,10 +257,7 @@ class WebFeatureService_1_1_0(WebFeatureService_):
 
     def getOperationByName(self, name):
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
 
 
@@ -292,32 +303,33 @@ class ContentMetadata:
                 'url': testXMLValue(m)
             }
 
-            if metadataUrl['url'] is not None and parse_remote_metadata:  # download URL
-                try:
-                    content = urlopen(metadataUrl['url'], timeout=timeout)
-                    doc = etree.parse(content)
-                    if metadataUrl['type'] is not None:
-                        if metadataUrl['type'] == 'FGDC':
-                            metadataUrl['metadata'] = Metadata(doc)
-                        if metadataUrl['type'] in ['TC211', '19115', '19139']:
-                            metadataUrl['metadata'] = MD_Metadata(doc)
-                except Exception:
-                    metadataUrl['metadata'] = None
-
             self.metadataUrls.append(metadataUrl)
 
+        if parse_remote_metadata:  # download URLs
+            resolve_remote_metadata(self.metadataUrls, _parse_remote_metadata,
+                                    max_workers=1, timeout=timeout)
+
         #others not used but needed for iContentMetadata harmonisation
         self.styles=None
         self.timepositions=None
         self.defaulttimeposition=None
 
+def _parse_remote_metadata(metadataUrl, doc):
+    """Return the metadata object for a remote MetadataURL document"""
+    if metadataUrl['type'] == 'FGDC':
+        return Metadata(doc)
+    if metadataUrl['type'] in ['TC211', '19115', '19139']:
+        return MD_Metadata(doc)
+
+
 class WFSCapabilitiesReader(object):
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='1.0'):
+    def __init__(self, version='1.0', session=None):
         """Initialize"""
         self.version = version
+        self.session = session
         self._infoset = None
 
     def capabilities_url(self, service_url):
@@ -351,8 +363,10 @@ class WFSCapabilitiesReader(object):
             A timeout value (in seconds) for the request.
         """
         request = self.capabilities_url(url)
-        u = urlopen(request, timeout=timeout)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return (self.session or get_session()).open(
+                Request(request, headers=headers), timeout=timeout)
+        return etree.fromstring(read_capabilities(request, opener))
 
     def readString(self, st):
         """Parse a WFS capabilities document, returning an
@@ -11,8 +11,10 @@ from __future__ import (absolute_import, division, print_function)
 #owslib imports:
 from owslib.ows import ServiceIdentification, ServiceProvider, OperationsMetadata
 from owslib.etree import etree
-from owslib.util import nspath, testXMLValue
+from owslib.util import nspath, testXMLValue, resolve_remote_metadata, OperationTable
 from owslib.crs import Crs
+from owslib.fgdc import Metadata
+from owslib.iso import MD_Metadata
 from owslib.feature import WebFeatureService_
 from owslib.namespaces import Namespaces
 
@@ -20,7 +22,9 @@ from owslib.namespaces import Namespaces
 import cgi
 from cStringIO import StringIO
 from urllib import urlencode
-from urllib2 import urlopen
+from urllib2 import urlopen, Request
+from owslib.transport import get_session
+from owslib.cache import read_capabilities
 
 import logging
 from owslib.util import log
@@ -42,7 +46,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
 
     Implements IWebFeatureService.
     """
-    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30):
+    def __new__(self,url, version, xml, parse_remote_metadata=False, timeout=30, session=None):
         """ overridden __new__ method 
         
         @type url: string
@@ -52,10 +56,12 @@ class WebFeatureService_2_0_0(WebFeatureService_):
         @type parse_remote_metadata: boolean
         @param parse_remote_metadata: whether to fully process MetadataURL elements
         @param timeout: time (in seconds) after which requests should timeout
+        @type session: owslib.transport.Session
+        @param session: HTTP session used for all requests (default session if None)
         @return: initialized WebFeatureService_2_0_0 object
         """
         obj=object.__new__(self)
-        obj.__init__(url, version, xml, parse_remote_metadata, timeout)
+        obj.__init__(url, version, xml, parse_remote_metadata, timeout, session)
         return obj
     
     def __getitem__(self,name):
@@ -66,15 +72,16 @@ class WebFeatureService_2_0_0(WebFeatureService_):
             raise KeyError("No content named %s" % name)
     
     
-    def __init__(self, url,  version, xml=None, parse_remote_metadata=False, timeout=30):
+    def __init__(self, url,  version, xml=None, parse_remote_metadata=False, timeout=30, session=None):
         """Initialize."""
         if log.isEnabledFor(logging.DEBUG):
             log.debug('building WFS %s'%url)
         self.url = url
         self.version = version
         self.timeout = timeout
+        self.session = session
         self._capabilities = None
-        reader = WFSCapabilitiesReader(self.version)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
         if xml:
             self._capabilities = reader.readString(xml)
         else:
@@ -108,6 +115,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
         for elem in self._capabilities.find(nspath('OperationsMetadata'))[:]:
             if elem.tag !=nspath('ExtendedCapabilities'):
                 self.operations.append(OperationsMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
                    
         #serviceContents metadata: our assumption is that services use a top-level 
         #layer as a metadata organizer, nothing more. 
@@ -116,8 +124,14 @@ class WebFeatureService_2_0_0(WebFeatureService_):
         featuretypelist=self._capabilities.find(nspath('FeatureTypeList',ns=WFS_NAMESPACE))
         features = self._capabilities.findall(nspath('FeatureTypeList/FeatureType', ns=WFS_NAMESPACE))
         for feature in features:
-            cm=ContentMetadata(feature, featuretypelist, parse_remote_metadata)
+            cm=ContentMetadata(feature, featuretypelist)
             self.contents[cm.id]=cm       
+
+        # fetch the remote metadata of all feature types at once
+        if parse_remote_metadata:
+            resolve_remote_metadata(
+                [m for cm in self.contents.values() for m in cm.metadataUrls],
+                _parse_remote_metadata, timeout=self.timeout, session=self.session)
         
         #exceptions
         self.exceptions = [f.text for f \
@@ -127,8 +141,8 @@ class WebFeatureService_2_0_0(WebFeatureService_):
         """Request and return capabilities document from the WFS as a 
         file-like object.
         NOTE: this is effectively redundant now"""
-        reader = WFSCapabilitiesReader(self.version)
-        return urlopen(reader.capabilities_url(self.url), timeout=self.timeout)
+        reader = WFSCapabilitiesReader(self.version, session=self.session)
+        return (self.session or get_session()).open(reader.capabilities_url(self.url), timeout=self.timeout)
     
     def items(self):
         '''supports dict-like items() access'''
@@ -139,7 +153,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
     
     def getfeature(self, typename=None, filter=None, bbox=None, featureid=None,
                    featureversion=None, propertyname=None, maxfeatures=None,storedQueryID=None, storedQueryParams={},
-                   method='Get', outputFormat=None, startindex=None):
+                   method='Get', outputFormat=None, startindex=None, resulttype=None):
         """Request and return feature data as a file-like object.
         #TODO: NOTE: have changed property name from ['*'] to None - check the use of this in WFS 2.0
         Parameters
@@ -164,6 +178,8 @@ class WebFeatureService_2_0_0(WebFeatureService_):
             Requested response format of the request.
         startindex: int (optional)
             Start position to return feature set (paging in combination with maxfeatures)
+        resulttype: string (optional)
+            'results' (default) or 'hits' to only request the number of features
 
         There are 3 different modes of use
 
@@ -178,7 +194,8 @@ class WebFeatureService_2_0_0(WebFeatureService_):
             (url) = self.getGETGetFeatureRequest(typename, filter, bbox, featureid,
                                                  featureversion, propertyname,
                                                  maxfeatures, storedQueryID,
-                                                 storedQueryParams, outputFormat, 'Get', startindex)
+                                                 storedQueryParams, outputFormat, 'Get', startindex,
+                                                 resulttype)
             if log.isEnabledFor(logging.DEBUG):
                 log.debug('GetFeature WFS GET url %s'% url)
         else:
@@ -186,7 +203,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
 
 
         # If method is 'Post', data will be None here
-        u = urlopen(url, data, self.timeout)
+        u = (self.session or get_session()).open(url, data, self.timeout)
         
         # check for service exceptions, rewrap, and return
         # We're going to assume that anything with a content-length > 32k
@@ -222,10 +239,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
 
     def getpropertyvalue(self, query=None, storedquery_id=None, valuereference=None, typename=None, method=nspath('Get'),**kwargs):
         ''' the WFS GetPropertyValue method'''
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetPropertyValue').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetPropertyValue', method, default=self.url)
         request = {'service': 'WFS', 'version': self.version, 'request': 'GetPropertyValue'}
         if query:
             request['query'] = str(query)
@@ -239,7 +253,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
             for kw in kwargs.keys():
                 request[kw]=str(kwargs[kw])
         encoded_request=urlencode(request)
-        u = urlopen(base_url + encoded_request)
+        u = (self.session or get_session()).open(base_url + encoded_request)
         return u.read()
         
         
@@ -251,14 +265,11 @@ class WebFeatureService_2_0_0(WebFeatureService_):
         method=nspath('Get')
         
         #first make the ListStoredQueries response and save the results in a dictionary if form {storedqueryid:(title, returnfeaturetype)}
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('ListStoredQueries').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('ListStoredQueries', method, default=self.url)
 
         request = {'service': 'WFS', 'version': self.version, 'request': 'ListStoredQueries'}
         encoded_request = urlencode(request)
-        u = urlopen(base_url, data=encoded_request, timeout=self.timeout)
+        u = (self.session or get_session()).open(base_url, data=encoded_request, timeout=self.timeout)
         tree=etree.fromstring(u.read())
         tempdict={}       
         for sqelem in tree[:]:
@@ -272,13 +283,10 @@ class WebFeatureService_2_0_0(WebFeatureService_):
             tempdict[id]=(title,rft)        #store in temporary dictionary
         
         #then make the DescribeStoredQueries request and get the rest of the information about the stored queries 
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('DescribeStoredQueries').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('DescribeStoredQueries', method, default=self.url)
         request = {'service': 'WFS', 'version': self.version, 'request': 'DescribeStoredQueries'}
         encoded_request = urlencode(request)
-        u = urlopen(base_url, data=encoded_request, timeout=to)
+        u = (self.session or get_session()).open(base_url, data=encoded_request, timeout=self.timeout)
         tree=etree.fromstring(u.read())
         tempdict2={} 
         for sqelem in tree[:]:
@@ -302,10 +310,7 @@ class WebFeatureService_2_0_0(WebFeatureService_):
 
     def getOperationByName(self, name):
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
 class StoredQuery(object):
     '''' Class to describe a storedquery '''
@@ -384,27 +389,29 @@ class ContentMetadata:
                 'url': testXMLValue(m.find('OnlineResource').attrib['{http://www.w3.org/1999/xlink}href'], attrib=True)
             }
 
-            if metadataUrl['url'] is not None and parse_remote_metadata:  # download URL
-                try:
-                    content = urllib2.urlopen(metadataUrl['url'], timeout=timeout)
-                    doc = etree.parse(content)
-                    try:  # FGDC
-                        metadataUrl['metadata'] = Metadata(doc)
-                    except:  # ISO
-                        metadataUrl['metadata'] = MD_Metadata(doc)
-                except Exception:
-                    metadataUrl['metadata'] = None
-
             self.metadataUrls.append(metadataUrl)
 
+        if parse_remote_metadata:  # download URLs
+            resolve_remote_metadata(self.metadataUrls, _parse_remote_metadata,
+                                    max_workers=1, timeout=timeout)
+
+
+def _parse_remote_metadata(metadataUrl, doc):
+    """Return the metadata object for a remote MetadataURL document"""
+    try:  # FGDC
+        return Metadata(doc)
+    except:  # ISO
+        return MD_Metadata(doc)
+
 
 class WFSCapabilitiesReader(object):
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='2.0.0'):
+    def __init__(self, version='2.0.0', session=None):
         """Initialize"""
         self.version = version
+        self.session = session
         self._infoset = None
 
     def capabilities_url(self, service_url):
@@ -438,8 +445,10 @@ class WFSCapabilitiesReader(object):
             A timeout value (in seconds) for the request.
         """
         request = self.capabilities_url(url)
-        u = urlopen(request, timeout=timeout)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return (self.session or get_session()).open(
+                Request(request, headers=headers), timeout=timeout)
+        return etree.fromstring(read_capabilities(request, opener))
 
     def readString(self, st):
         """Parse a WFS capabilities document, returning an
@@ -26,8 +26,27 @@ namespaces = get_namespaces()
 
 
 class MD_Metadata(object):
-    """ Process gmd:MD_Metadata """
-    def __init__(self, md=None):
+    """ Process gmd:MD_Metadata
+
+    With lazy=True only the header elements (identifier, language, dates,
+    ...) are parsed up front; the contact, referencesystem, identification,
+    identificationinfo, distribution and dataquality sections are parsed
+    when first accessed, and xml is serialised only when requested.
+    """
+
+    # lazily parsed attributes and the method parsing their section
+    _SECTIONS = {
+        'xml': '_parse_xml',
+        'contact': '_parse_contact',
+        'referencesystem': '_parse_referencesystem',
+        'identification': '_parse_identification',
+        'serviceidentification': '_parse_identification',
+        'identificationinfo': '_parse_identificationinfo',
+        'distribution': '_parse_distribution',
+        'dataquality': '_parse_dataquality',
+    }
+
+    def __init__(self, md=None, lazy=False):
 
         if md is None:
             self.xml = None
@@ -51,9 +70,8 @@ class MD_Metadata(object):
             self.dataquality = None
         else:
             if hasattr(md, 'getroot'):  # standalone document
-                self.xml = etree.tostring(md.getroot())
-            else:  # part of a larger document
-                self.xml = etree.tostring(md)
+                md = md.getroot()
+            self._md = md
 
             val = md.find(util.nspath_eval('gmd:fileIdentifier/gco:CharacterString', namespaces))
             self.identifier = util.testXMLValue(val)
@@ -81,11 +99,6 @@ class MD_Metadata(object):
       
             self.hierarchy = _testCodeListValue(md.find(util.nspath_eval('gmd:hierarchyLevel/gmd:MD_ScopeCode', namespaces)))
 
-            self.contact = []
-            for i in md.findall(util.nspath_eval('gmd:contact/gmd:CI_ResponsibleParty', namespaces)):
-                o = CI_ResponsibleParty(i)
-                self.contact.append(o)
-            
             val = md.find(util.nspath_eval('gmd:dateStamp/gco:DateTime', namespaces))
             self.datetimestamp = util.testXMLValue(val)
             
@@ -95,56 +108,87 @@ class MD_Metadata(object):
             val = md.find(util.nspath_eval('gmd:metadataStandardVersion/gco:CharacterString', namespaces))
             self.stdver = util.testXMLValue(val)
 
-            val = md.find(util.nspath_eval('gmd:referenceSystemInfo/gmd:MD_ReferenceSystem', namespaces))
-            if val is not None:
-                self.referencesystem = MD_ReferenceSystem(val)
-            else:
-                self.referencesystem = None
+            if not lazy:
+                for parser in sorted(set(self._SECTIONS.values())):
+                    getattr(self, parser)()
+                del self._md
+
+    def __getattr__(self, name):
+        # only called for attributes which are not set yet: parse their section
+        parser = self._SECTIONS.get(name)
+        if parser is None or '_md' not in self.__dict__:
+            raise AttributeError(name)
+        getattr(self, parser)()
+        return self.__dict__[name]
+
+    def _root(self):
+        return self._md
+
+    def _parse_xml(self):
+        self.xml = etree.tostring(self._root())
+
+    def _parse_contact(self):
+        self.contact = []
+        for i in self._root().findall(util.nspath_eval('gmd:contact/gmd:CI_ResponsibleParty', namespaces)):
+            o = CI_ResponsibleParty(i)
+            self.contact.append(o)
+
+    def _parse_referencesystem(self):
+        val = self._root().find(util.nspath_eval('gmd:referenceSystemInfo/gmd:MD_ReferenceSystem', namespaces))
+        if val is not None:
+            self.referencesystem = MD_ReferenceSystem(val)
+        else:
+            self.referencesystem = None
 
-            # TODO: merge .identificationinfo into .identification
-            #warnings.warn(
-            #    'the .identification and .serviceidentification properties will merge into '
-            #    '.identification being a list of properties.  This is currently implemented '
-            #    'in .identificationinfo.  '
-            #    'Please see https://github.com/geopython/OWSLib/issues/38 for more information',
-            #    FutureWarning)
+    def _parse_identification(self):
+        md = self._root()
 
-            val = md.find(util.nspath_eval('gmd:identificationInfo/gmd:MD_DataIdentification', namespaces))
-            val2 = md.find(util.nspath_eval('gmd:identificationInfo/srv:SV_ServiceIdentification', namespaces))
+        # TODO: merge .identificationinfo into .identification
+        #warnings.warn(
+        #    'the .identification and .serviceidentification properties will merge into '
+        #    '.identification being a list of properties.  This is currently implemented '
+        #    'in .identificationinfo.  '
+        #    'Please see https://github.com/geopython/OWSLib/issues/38 for more information',
+        #    FutureWarning)
 
-            if val is not None:
-                self.identification = MD_DataIdentification(val, 'dataset')
-                self.serviceidentification = None
-            elif val2 is not None:
-                self.identification = MD_DataIdentification(val2, 'service')
-                self.serviceidentification = SV_ServiceIdentification(val2)
-            else:
-                self.identification = None
-                self.serviceidentification = None
+        val = md.find(util.nspath_eval('gmd:identificationInfo/gmd:MD_DataIdentification', namespaces))
+        val2 = md.find(util.nspath_eval('gmd:identificationInfo/srv:SV_ServiceIdentification', namespaces))
 
-            self.identificationinfo = []
-            for idinfo in md.findall(util.nspath_eval('gmd:identificationInfo', namespaces)):
-                val = list(idinfo)[0]
-                tagval = util.xmltag_split(val.tag)
-                if tagval == 'MD_DataIdentification': 
-                    self.identificationinfo.append(MD_DataIdentification(val, 'dataset'))
-                elif tagval == 'MD_ServiceIdentification': 
-                    self.identificationinfo.append(MD_DataIdentification(val, 'service'))
-                elif tagval == 'SV_ServiceIdentification': 
-                    self.identificationinfo.append(SV_ServiceIdentification(val))
-
-            val = md.find(util.nspath_eval('gmd:distributionInfo/gmd:MD_Distribution', namespaces))
+        if val is not None:
+            self.identification = MD_DataIdentification(val, 'dataset')
+            self.serviceidentification = None
+        elif val2 is not None:
+            self.identification = MD_DataIdentification(val2, 'service')
+            self.serviceidentification = SV_ServiceIdentification(val2)
+        else:
+            self.identification = None
+            self.serviceidentification = None
 
-            if val is not None:
-                self.distribution = MD_Distribution(val)
-            else:
-                self.distribution = None
-            
-            val = md.find(util.nspath_eval('gmd:dataQualityInfo/gmd:DQ_DataQuality', namespaces))
-            if val is not None:
-                self.dataquality = DQ_DataQuality(val)
-            else:
-                self.dataquality = None
+    def _parse_identificationinfo(self):
+        self.identificationinfo = []
+        for idinfo in self._root().findall(util.nspath_eval('gmd:identificationInfo', namespaces)):
+            val = list(idinfo)[0]
+            tagval = util.xmltag_split(val.tag)
+            if tagval == 'MD_DataIdentification': 
+                self.identificationinfo.append(MD_DataIdentification(val, 'dataset'))
+            elif tagval == 'MD_ServiceIdentification': 
+                self.identificationinfo.append(MD_DataIdentification(val, 'service'))
+            elif tagval == 'SV_ServiceIdentification': 
+                self.identificationinfo.append(SV_ServiceIdentification(val))
+
+    def _parse_distribution(self):
+        val = self._root().find(util.nspath_eval('gmd:distributionInfo/gmd:MD_Distribution', namespaces))
+        if val is not None:
+            self.distribution = MD_Distribution(val)
+        else:
+            self.distribution = None
+
+    def _parse_dataquality(self):
+        val = self._root().find(util.nspath_eval('gmd:dataQualityInfo/gmd:DQ_DataQuality', namespaces))
+        if val is not None:
+            self.dataquality = DQ_DataQuality(val)
+        else:
+            self.dataquality = None
 
 class CI_Date(object):
     """ process CI_Date """
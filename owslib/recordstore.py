@@ -0,0 +1,358 @@
+# -*- coding: ISO-8859-15 -*-
+# =============================================================================
+# OWSLib. Copyright (C) 2014 OWSLib contributors
+#
+# Contact email: tomkralidis@gmail.com
+# =============================================================================
+
+"""
+Local SQLite index of records harvested from a CSW.
+
+RecordStore keeps CswRecord and MD_Metadata objects in a single SQLite file,
+with a full text index over the text of each record (AnyText) and an R-tree
+over their bounding boxes, so that catalogues can be mirrored and searched
+locally:
+
+    >>> from owslib.csw import CatalogueServiceWeb
+    >>> from owslib.recordstore import RecordStore
+    >>> store = RecordStore('catalogue.db')  # doctest: +SKIP
+    >>> csw = CatalogueServiceWeb(url)  # doctest: +SKIP
+    >>> store.sync(csw)  # doctest: +SKIP
+    >>> store.search(anytext='roads', bbox=[-180, -90, 180, 90])  # doctest: +SKIP
+
+sync only requests the records modified since the most recent modification
+date of the records previously harvested from the same catalogue in the same
+outputSchema (with an ogc:PropertyIsGreaterThan filter), so refreshing a
+mirror only transfers the records which have changed.  Modification dates are
+stored as ISO 8601 UTC strings so that they compare chronologically whatever
+format the catalogue used.  Records deleted from the catalogue are not
+detected by sync and stay in the store until removed with delete.
+
+SQLite builds without the FTS4 or R-tree extensions are supported, searches
+are then answered with plain table scans.
+
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import sqlite3
+import threading
+from datetime import datetime
+
+from dateutil import parser
+import pytz
+
+from owslib.etree import etree
+from owslib import fes
+from owslib.csw import CswRecord, namespaces
+from owslib.iso import MD_Metadata
+
+
+def _text(xml):
+    """Return the text content of an XML document, as used for AnyText"""
+    return ' '.join(t.strip() for t in etree.fromstring(xml).itertext() if t.strip())
+
+
+def _bounds(bbox):
+    """Return (minx, miny, maxx, maxy) as floats, or None"""
+    if bbox is None:
+        return None
+    try:
+        return tuple(float(getattr(bbox, k)) for k in ('minx', 'miny', 'maxx', 'maxy'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _modified(value):
+    """Return a modification date as an ISO 8601 UTC string, or None if it
+    cannot be parsed"""
+    if not value:
+        return None
+    try:
+        dt = parser.parse(value, default=datetime(1970, 1, 1))
+    except (ValueError, OverflowError, TypeError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.utc).replace(tzinfo=None)
+    return '%sZ' % dt.replace(microsecond=0).isoformat()
+
+
+def _fields(record):
+    """Return the indexed fields of a CswRecord or MD_Metadata as a dict"""
+    if isinstance(record, MD_Metadata):
+        identification = record.identification
+        keywords = []
+        bbox = None
+        title = abstract = None
+        if identification is not None:
+            title = identification.title
+            abstract = identification.abstract
+            for kw in identification.keywords:
+                keywords.extend(kw['keywords'])
+            bbox = getattr(identification, 'bbox', None)
+        return {'identifier': record.identifier, 'schema': 'gmd',
+                'title': title, 'abstract': abstract, 'keywords': keywords,
+                'modified': _modified(record.datestamp), 'bbox': _bounds(bbox),
+                'xml': record.xml}
+    if isinstance(record, CswRecord):
+        return {'identifier': record.identifier, 'schema': 'csw',
+                'title': record.title, 'abstract': record.abstract,
+                'keywords': [s for s in record.subjects if s],
+                'modified': _modified(record.modified),
+                'bbox': _bounds(record.bbox_wgs84) or _bounds(record.bbox),
+                'xml': record.xml}
+    raise TypeError('cannot store %r, expected a CswRecord or MD_Metadata' % record)
+
+
+class RecordStore(object):
+    """SQLite store of CSW records with text and spatial indexes
+
+    Parameters
+    ----------
+
+    - path: SQLite database file (default is ':memory:')
+
+    Records are keyed by identifier: a record harvested from a second
+    catalogue replaces the stored record with the same identifier.
+
+    """
+
+    # modification date queryable by outputSchema, used by sync
+    MODIFIED_PROPERTIES = {
+        namespaces['csw']: 'dct:modified',
+        namespaces['gmd']: 'apiso:Modified',
+    }
+
+    # stored schema of the records by outputSchema
+    SCHEMAS = {
+        namespaces['csw']: 'csw',
+        namespaces['gmd']: 'gmd',
+    }
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.text_factory = str
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS records ('
+            'identifier TEXT PRIMARY KEY, schema TEXT, title TEXT, '
+            'abstract TEXT, keywords TEXT, modified TEXT, xml BLOB, '
+            'source TEXT)')
+        columns = [row[1] for row in self._db.execute('PRAGMA table_info(records)')]
+        if 'source' not in columns:  # store created by an earlier version
+            self._db.execute('ALTER TABLE records ADD COLUMN source TEXT')
+        self._db.execute('CREATE INDEX IF NOT EXISTS records_source_modified '
+                         'ON records (source, schema, modified)')
+        self.fts = self._create(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS records_text '
+            'USING fts4(anytext)',
+            'CREATE TABLE IF NOT EXISTS records_text ('
+            'docid INTEGER PRIMARY KEY, anytext TEXT)')
+        self.rtree = self._create(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS records_bbox '
+            'USING rtree(id, minx, maxx, miny, maxy)',
+            'CREATE TABLE IF NOT EXISTS records_bbox ('
+            'id INTEGER PRIMARY KEY, minx REAL, maxx REAL, miny REAL, maxy REAL)')
+        self._db.commit()
+
+    def _create(self, virtual, fallback):
+        """Create a virtual table, or a plain table if the module is missing"""
+        try:
+            self._db.execute(virtual)
+            return True
+        except sqlite3.OperationalError:
+            self._db.execute(fallback)
+            return False
+
+    def _put(self, record, source):
+        fields = _fields(record)
+        if fields['identifier'] is None:
+            raise ValueError('cannot store a record without an identifier')
+        row = (fields['schema'], fields['title'], fields['abstract'],
+               ' '.join(fields['keywords']), fields['modified'],
+               sqlite3.Binary(fields['xml']), source)
+        rowid = self._rowid(fields['identifier'])
+        if rowid is None:
+            rowid = self._db.execute(
+                'INSERT INTO records (schema, title, abstract, keywords, '
+                'modified, xml, source, identifier) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                row + (fields['identifier'],)).lastrowid
+        else:
+            self._db.execute(
+                'UPDATE records SET schema = ?, title = ?, abstract = ?, '
+                'keywords = ?, modified = ?, xml = ?, source = ? '
+                'WHERE rowid = ?', row + (rowid,))
+            self._unindex(rowid)
+        self._db.execute('INSERT INTO records_text (docid, anytext) VALUES (?, ?)',
+                         (rowid, _text(fields['xml'])))
+        bbox = fields['bbox']
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            self._db.execute('INSERT INTO records_bbox VALUES (?, ?, ?, ?, ?)',
+                             (rowid, minx, maxx, miny, maxy))
+
+    def _rowid(self, identifier):
+        row = self._db.execute('SELECT rowid FROM records WHERE identifier = ?',
+                               (identifier,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _unindex(self, rowid):
+        self._db.execute('DELETE FROM records_text WHERE docid = ?', (rowid,))
+        self._db.execute('DELETE FROM records_bbox WHERE id = ?', (rowid,))
+
+    def put(self, record, source=None):
+        """Store a CswRecord or MD_Metadata, replacing the record with the
+        same identifier.  source identifies where the record comes from
+        (sync uses the catalogue URL)"""
+        with self._lock:
+            self._put(record, source)
+            self._db.commit()
+
+    def put_records(self, records, source=None):
+        """Store the records of an iterable in a single transaction,
+        returning the number of records stored.  If the iterable raises,
+        the transaction is rolled back and nothing is stored"""
+        count = 0
+        try:
+            # records may be fetched lazily, do not hold the lock meanwhile
+            for record in records:
+                with self._lock:
+                    self._put(record, source)
+                count += 1
+        except:
+            with self._lock:
+                self._db.rollback()
+            raise
+        with self._lock:
+            self._db.commit()
+        return count
+
+    def _record(self, schema, xml):
+        if schema == 'gmd':
+            return MD_Metadata(etree.fromstring(xml))
+        return CswRecord(etree.fromstring(xml))
+
+    def get(self, identifier):
+        """Return the stored record for identifier, or None"""
+        with self._lock:
+            row = self._db.execute('SELECT schema, xml FROM records '
+                                   'WHERE identifier = ?', (identifier,)).fetchone()
+        if row is None:
+            return None
+        return self._record(row[0], str(row[1]))
+
+    def delete(self, identifier):
+        """Remove the record for identifier from the store"""
+        with self._lock:
+            rowid = self._rowid(identifier)
+            if rowid is not None:
+                self._unindex(rowid)
+                self._db.execute('DELETE FROM records WHERE rowid = ?', (rowid,))
+            self._db.commit()
+
+    def __contains__(self, identifier):
+        with self._lock:
+            return self._rowid(identifier) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def last_modified(self, source=None, schema=None):
+        """Return the most recent modification date (ISO 8601, UTC) of the
+        stored records, or None.  With source or schema ('csw' or 'gmd') only
+        the records from that source or in that schema are considered."""
+        sql = 'SELECT MAX(modified) FROM records'
+        where = []
+        args = []
+        for column, value in (('source', source), ('schema', schema)):
+            if value is not None:
+                where.append('%s = ?' % column)
+                args.append(value)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()[0]
+
+    def search(self, anytext=None, bbox=None, limit=None):
+        """Return the identifiers of the stored records matching a query.
+
+        Parameters
+        ----------
+
+        - anytext: words which must all appear in the text of the record
+        - bbox: [minx, miny, maxx, maxy] intersecting the bounding box of the record
+        - limit: maximum number of identifiers returned
+
+        """
+        sql = 'SELECT records.identifier FROM records'
+        where = []
+        args = []
+        if anytext is not None:
+            sql += ' JOIN records_text ON records_text.docid = records.rowid'
+            if self.fts:
+                where.append('records_text MATCH ?')
+                args.append(anytext)
+            else:
+                for word in anytext.split():
+                    where.append('records_text.anytext LIKE ?')
+                    args.append('%' + word + '%')
+        if bbox is not None:
+            sql += ' JOIN records_bbox ON records_bbox.id = records.rowid'
+            where.append('records_bbox.minx <= ? AND records_bbox.maxx >= ? AND '
+                         'records_bbox.miny <= ? AND records_bbox.maxy >= ?')
+            args.extend([bbox[2], bbox[0], bbox[3], bbox[1]])
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY records.rowid'
+        if limit is not None:
+            sql += ' LIMIT %d' % int(limit)
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql, args)]
+
+    def records(self, identifiers):
+        """Return the stored records for a list of identifiers"""
+        return [self.get(identifier) for identifier in identifiers]
+
+    def sync(self, csw, outputschema=namespaces['csw'], constraints=None,
+             propertyname=None, pagesize=100, prefetch=0, **kwargs):
+        """Fetch the records of csw modified since the last sync.
+
+        The records modified after the most recent modification date of the
+        records already harvested from csw.url in outputschema are requested
+        with getrecords (all records the first time) and stored.  Records
+        deleted from the catalogue are not removed from the store.  The
+        records are stored in a single transaction, so a sync failing partway
+        stores nothing and does not advance the modification date the next
+        sync starts from.  Returns the number of records stored.
+
+        Parameters
+        ----------
+
+        - csw: the CatalogueServiceWeb to harvest
+        - outputschema: the outputSchema of the records (default is csw:Record)
+        - constraints: list of OgcExpression objects which must all match
+        - propertyname: queryable holding the modification date (default is
+          dct:modified for csw:Record and apiso:Modified for ISO records)
+        - pagesize, prefetch, **kwargs: paging and other getrecords2
+          parameters, see CatalogueServiceWeb.iterrecords
+
+        """
+        operations = list(constraints or [])
+        since = self.last_modified(csw.url, self.SCHEMAS.get(outputschema))
+        if since is not None:
+            if propertyname is None:
+                propertyname = self.MODIFIED_PROPERTIES.get(outputschema, 'apiso:Modified')
+            operations.append(fes.PropertyIsGreaterThan(propertyname, since))
+        if len(operations) > 1:
+            operations = [operations]
+        kwargs.setdefault('esn', 'full')
+        return self.put_records(csw.iterrecords(
+            pagesize=pagesize, prefetch=prefetch, outputschema=outputschema,
+            constraints=operations, **kwargs), csw.url)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -16,10 +16,10 @@ from __future__ import (absolute_import, division, print_function)
 from .swe.observation import sos100, sos200
 
 
-def SensorObservationService(url, version='1.0.0', xml=None):
+def SensorObservationService(url, version='1.0.0', xml=None, username=None, password=None, session=None):
     """sos factory function, returns a version specific SensorObservationService object"""
     if version in  ['1.0', '1.0.0']:
-        return sos100.SensorObservationService_1_0_0.__new__(sos100.SensorObservationService_1_0_0, url, version, xml)
+        return sos100.SensorObservationService_1_0_0.__new__(sos100.SensorObservationService_1_0_0, url, version, xml, username, password, session)
     elif version in ['2.0', '2.0.0']:
-        return sos200.SensorObservationService_2_0_0.__new__(sos200.SensorObservationService_2_0_0, url, version, xml)
+        return sos200.SensorObservationService_2_0_0.__new__(sos200.SensorObservationService_2_0_0, url, version, xml, username, password, session)
 
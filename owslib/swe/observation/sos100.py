@@ -7,8 +7,10 @@ from urllib import urlencode
 from owslib import ows
 from owslib.crs import Crs
 from owslib.fes import FilterCapabilities
-from owslib.util import openURL, testXMLValue, nspath_eval, nspath, extract_time
+from owslib.util import openURL, testXMLValue, nspath_eval, nspath, extract_time, OperationTable
 from owslib.namespaces import Namespaces
+from owslib.cache import read_capabilities
+from owslib.transport import run_async
 
 def get_namespaces():
     n = Namespaces()
@@ -24,10 +26,10 @@ class SensorObservationService_1_0_0(object):
         Implements ISensorObservationService.
     """
 
-    def __new__(self,url, version, xml=None, username=None, password=None):
+    def __new__(self,url, version, xml=None, username=None, password=None, session=None):
         """overridden __new__ method"""
         obj=object.__new__(self)
-        obj.__init__(url, version, xml, username, password)
+        obj.__init__(url, version, xml, username, password, session)
         return obj
 
     def __getitem__(self,id):
@@ -37,17 +39,19 @@ class SensorObservationService_1_0_0(object):
         else:
             raise KeyError("No Observational Offering with id: %s" % id)
 
-    def __init__(self, url, version='1.0.0', xml=None, username=None, password=None):
+    def __init__(self, url, version='1.0.0', xml=None, username=None, password=None, session=None):
         """Initialize."""
         self.url = url
         self.username = username
         self.password = password
+        self.session = session
         self.version = version
         self._capabilities = None
 
         # Authentication handled by Reader
         reader = SosCapabilitiesReader(
-                version=self.version, url=self.url, username=self.username, password=self.password
+                version=self.version, url=self.url, username=self.username, password=self.password,
+                session=self.session
                 )
         if xml:  # read from stored xml
             self._capabilities = reader.read_string(xml)
@@ -63,10 +67,7 @@ class SensorObservationService_1_0_0(object):
 
     def getOperationByName(self, name):
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
     def _build_metadata(self):
         """
@@ -84,6 +85,7 @@ class SensorObservationService_1_0_0(object):
         self.operations=[]
         for elem in self._capabilities.findall(nspath_eval('ows:OperationsMetadata/ows:Operation', namespaces)):
             self.operations.append(ows.OperationsMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
 
         # sos:FilterCapabilities
         filters = self._capabilities.find(nspath_eval('sos:Filter_Capabilities', namespaces))
@@ -105,10 +107,7 @@ class SensorObservationService_1_0_0(object):
                                 method='Get',
                                 **kwargs):
 
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('DescribeSensor').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('DescribeSensor', method, default=self.url)
         request = {'service': 'SOS', 'version': self.version, 'request': 'DescribeSensor'}
 
         # Required Fields
@@ -130,7 +129,7 @@ class SensorObservationService_1_0_0(object):
         data = urlencode(request)
 
 
-        response = openURL(base_url, data, method, username=self.username, password=self.password, **url_kwargs).read()
+        response = openURL(base_url, data, method, username=self.username, password=self.password, session=self.session, **url_kwargs).read()
 
 
 
@@ -157,10 +156,7 @@ class SensorObservationService_1_0_0(object):
         **kwargs : extra arguments
             anything else e.g. vendor specific parameters
         """
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetObservation').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetObservation', method, default=self.url)
 
         request = {'service': 'SOS', 'version': self.version, 'request': 'GetObservation'}
 
@@ -189,7 +185,7 @@ class SensorObservationService_1_0_0(object):
 
         data = urlencode(request)
 
-        response = openURL(base_url, data, method, username=self.username, password=self.password, **kwargs).read()
+        response = openURL(base_url, data, method, username=self.username, password=self.password, session=self.session, **kwargs).read()
         try:
             tr = etree.fromstring(response)
             if tr.tag == nspath_eval("ows:ExceptionReport", namespaces):
@@ -201,14 +197,17 @@ class SensorObservationService_1_0_0(object):
         except BaseException:
             return response
 
+    def get_observation_async(self, *args, **kwargs):
+        """
+            Run get_observation in the background, returning a multiprocessing.pool.AsyncResult
+        """
+        return run_async(self.get_observation, *args, **kwargs)
+
     def get_operation_by_name(self, name):
         """
             Return a Operation item by name, case insensitive
         """
-        for item in self.operations:
-            if item.name.lower() == name.lower():
-                return item
-        raise KeyError("No Operation named %s" % name)
+        return self._operation_table.operation(name, case_sensitive=False)
 
 class SosObservationOffering(object):
     def __init__(self, element):
@@ -270,11 +269,12 @@ class SosObservationOffering(object):
         return 'Offering id: %s, name: %s' % (self.id, self.name)
 
 class SosCapabilitiesReader(object):
-    def __init__(self, version="1.0.0", url=None, username=None, password=None):
+    def __init__(self, version="1.0.0", url=None, username=None, password=None, session=None):
         self.version = version
         self.url = url
         self.username = username
         self.password = password
+        self.session = session
 
     def capabilities_url(self, service_url):
         """
@@ -306,8 +306,9 @@ class SosCapabilitiesReader(object):
         """
         getcaprequest = self.capabilities_url(service_url)
         spliturl=getcaprequest.split('?')
-        u = openURL(spliturl[0], spliturl[1], method='Get', username=self.username, password=self.password)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return openURL(spliturl[0], spliturl[1], method='Get', username=self.username, password=self.password, session=self.session, headers=headers)
+        return etree.fromstring(read_capabilities(getcaprequest, opener, self.username))
 
     def read_string(self, st):
         """
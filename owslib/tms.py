@@ -19,6 +19,8 @@ from __future__ import (absolute_import, division, print_function)
 
 from .etree import etree
 from .util import openURL, testXMLValue
+from .cache import read_capabilities
+from .transport import run_async
 
 
 FORCE900913 = False
@@ -41,20 +43,28 @@ class TileMapService(object):
     """
 
     def __init__(self, url, version='1.0.0', xml=None,
-                username=None, password=None, parse_remote_metadata=False
+                username=None, password=None, parse_remote_metadata=False,
+                session=None, tile_cache=None
                 ):
-        """Initialize."""
+        """Initialize.
+
+        tile_cache is an optional owslib.cache.TileCache in which the
+        tiles returned by gettile are stored.
+        """
         self.url = url
         self.username = username
         self.password = password
         self.version = version
+        self.session = session
+        self.tile_cache = tile_cache
         self.services = None
         self._capabilities = None
         self.contents={}
 
         # Authentication handled by Reader
         reader = TMSCapabilitiesReader(
-                self.version, url=self.url, un=self.username, pw=self.password
+                self.version, url=self.url, un=self.username, pw=self.password,
+                session=self.session
                 )
         if xml:  # read from stored xml
             self._capabilities = reader.readString(xml)
@@ -68,7 +78,8 @@ class TileMapService(object):
     def _getcapproperty(self):
         if not self._capabilities:
             reader = TMSCapabilitiesReader(
-                self.version, url=self.url, un=self.username, pw=self.password
+                self.version, url=self.url, un=self.username, pw=self.password,
+                session=self.session
                 )
             self._capabilities = ServiceMetadata(reader.read(self.url))
         return self._capabilities
@@ -84,7 +95,8 @@ class TileMapService(object):
         tilemaps = self._capabilities.find('TileMaps')
         if tilemaps is not None:
             for tilemap in tilemaps.findall('TileMap'):
-                cm = ContentMetadata(tilemap, un=self.username, pw=self.password)
+                cm = ContentMetadata(tilemap, un=self.username, pw=self.password,
+                                     session=self.session)
                 if cm.id:
                     if cm.id in self.contents:
                         raise KeyError('Content metadata for layer "%s" already exists' % cm.id)
@@ -117,13 +129,19 @@ class TileMapService(object):
                     items.append((item,self.contents[item]))
         return items
 
-    def _gettilefromset(self, tilesets, x, y,z, ext):
+    def _gettilefromset(self, tilesets, x, y,z, ext, tilemap=None):
         for tileset in tilesets:
             if tileset['order'] == z:
                 url = tileset['href'] + '/' + str(x) +'/' + str(y) + '.' + ext
-                u = openURL(url, '', username = self.username,
-                            password = self.password)
-                return u
+                def opener(headers):
+                    return openURL(url, '', username = self.username,
+                                   password = self.password,
+                                   session = self.session, headers = headers)
+                if self.tile_cache is None or tilemap is None:
+                    return opener(None)
+                key = (self.url, tilemap.id, '', tilemap.srs, str(z), y, x,
+                       tilemap.tilemap.mimetype or ext)
+                return self.tile_cache.fetch(key, opener, url)
         else:
             raise ValueError('cannot find zoomlevel %i for TileMap' % z)
 
@@ -132,7 +150,8 @@ class TileMapService(object):
             raise ValueError('either id or title and srs must be specified')
         if id:
             return self._gettilefromset(self.contents[id].tilemap.tilesets,
-                x, y, z, self.contents[id].tilemap.extension)
+                x, y, z, self.contents[id].tilemap.extension,
+                self.contents[id])
 
         elif title and srs:
             for tm in self.contents.values():
@@ -140,12 +159,12 @@ class TileMapService(object):
                     if mimetype:
                         if tm.tilemap.mimetype == mimetype:
                             return self._gettilefromset(tm.tilemap.tilesets,
-                                x, y, z, tm.tilemap.extension)
+                                x, y, z, tm.tilemap.extension, tm)
                     else:
                         #if no format is given we return the tile from the
                         # first tilemap that matches name and srs
                         return self._gettilefromset(tm.tilemap.tilesets,
-                            x, y,z, tm.tilemap.extension)
+                            x, y,z, tm.tilemap.extension, tm)
             else:
                 raise ValueError('cannot find %s with projection %s for zoomlevel %i'
                         %(title, srs, z) )
@@ -155,6 +174,10 @@ class TileMapService(object):
                 projection %s format %s at zoomlevel %i cannot be found'''
                 %(id, title, srs, format, z))
 
+    def gettile_async(self, *args, **kwargs):
+        """Run gettile in the background, returning a multiprocessing.pool.AsyncResult"""
+        return run_async(self.gettile, *args, **kwargs)
+
 
 class ServiceIdentification(object):
 
@@ -179,7 +202,7 @@ class ContentMetadata(object):
     def __str__(self):
         return 'Layer Title: %s, URL: %s' % (self.title, self.id)
 
-    def __init__(self, elem, un=None, pw=None):
+    def __init__(self, elem, un=None, pw=None, session=None):
         if elem.tag != 'TileMap':
             raise ValueError('%s should be a TileMap' % (elem,))
         self.id = elem.attrib['href']
@@ -188,12 +211,14 @@ class ContentMetadata(object):
         self.profile = elem.attrib['profile']
         self.password = pw
         self.username = pw
+        self.session = session
         self._tile_map = None
         self.type = elem.attrib.get('type')
 
     def _get_tilemap(self):
         if self._tile_map is None:
-            self._tile_map = TileMap(self.id, un=self.username, pw=self.password)
+            self._tile_map = TileMap(self.id, un=self.username, pw=self.password,
+                                     session=self.session)
             assert(self._tile_map.srs == self.srs)
         return self._tile_map
 
@@ -248,10 +273,11 @@ class TileMap(object):
     tilesets = None
     profile = None
 
-    def __init__(self, url=None, xml=None, un=None, pw=None):
+    def __init__(self, url=None, xml=None, un=None, pw=None, session=None):
         self.url = url
         self.username = un
         self.password = pw
+        self.session = session
         self.tilesets = []
         if xml and not url:
             self.readString(xml)
@@ -295,7 +321,8 @@ class TileMap(object):
                     'order': order})
 
     def read(self, url):
-        u = openURL(url, '', method='Get', username = self.username, password = self.password)
+        u = openURL(url, '', method='Get', username = self.username, password = self.password,
+                    session = self.session)
         self._parse(etree.fromstring(u.read()))
 
     def readString(self, st):
@@ -309,21 +336,24 @@ class TMSCapabilitiesReader(object):
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='1.0.0', url=None, un=None, pw=None):
+    def __init__(self, version='1.0.0', url=None, un=None, pw=None, session=None):
         """Initialize"""
         self.version = version
         self._infoset = None
         self.url = url
         self.username = un
         self.password = pw
+        self.session = session
 
 
     def read(self, service_url):
         """Get and parse a TMS capabilities document, returning an
         elementtree instance
         """
-        u = openURL(service_url, '', method='Get', username = self.username, password = self.password)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return openURL(service_url, '', method='Get', username = self.username, password = self.password,
+                           session = self.session, headers = headers)
+        return etree.fromstring(read_capabilities(service_url, opener, self.username))
 
     def readString(self, st):
         """Parse a TMS capabilities document, returning an elementtree instance
@@ -0,0 +1,752 @@
+# -*- coding: ISO-8859-15 -*-
+# =============================================================================
+# OWSLib. Copyright (C) 2014 OWSLib contributors
+#
+# Contact email: tomkralidis@gmail.com
+# =============================================================================
+
+"""
+HTTP transport shared by the OWSLib service classes.
+
+A Session wraps a urllib2 opener whose HTTP and HTTPS handlers keep
+connections alive and pool them per host, so that consecutive requests to
+the same server (GetMap, GetTile, GetFeature, ...) do not pay a new TCP
+(and TLS) handshake each time.  Responses are requested with gzip/deflate
+content coding and are decompressed incrementally as they are read.
+
+All module level helpers (owslib.util.openURL, owslib.util.http_post) use
+the default session unless one is passed explicitly.  Service classes accept
+a ``session`` keyword argument so that several of them can share one pool:
+
+    >>> from owslib.transport import Session
+    >>> session = Session(maxsize=4, idle_timeout=30)
+    >>> wms = WebMapService(url, session=session)  # doctest: +SKIP
+    >>> wmts = WebMapTileService(url, session=session)  # doctest: +SKIP
+
+Transient failures (502/503/504 responses, dropped connections, ...) are
+retried by the session according to its RetryPolicy:
+
+    >>> from owslib.transport import RetryPolicy
+    >>> session = Session(retry=RetryPolicy(max_attempts=5, backoff_factor=1))
+
+Requests can be throttled per host, with a token bucket limiting the request
+rate and a limit on the number of requests in flight, to stay within what a
+provider tolerates when downloading in bulk:
+
+    >>> session = Session(rate=10, burst=5, max_in_flight=4)
+    >>> session.set_limit('http://tiles.example.org/wmts', rate=2, max_in_flight=1)
+    >>> wmts = WebMapTileService(url, session=session)  # doctest: +SKIP
+
+The ``*_async`` variants of the request methods (getmap_async,
+gettile_async, getfeature_async, ...) run the blocking request on the
+shared thread pool of an AsyncTransport and return immediately with a
+multiprocessing.pool.AsyncResult:
+
+    >>> result = wms.getmap_async(layers=['nexrad-n0r'], srs='EPSG:4326',  # doctest: +SKIP
+    ...                           bbox=(-126, 24, -66, 50), size=(512, 256),
+    ...                           format='image/png')
+    >>> img = result.get(timeout=60)  # doctest: +SKIP
+
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import errno
+import httplib
+import random
+import socket
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+import urllib2
+import urlparse
+import zlib
+from email.utils import parsedate_tz, mktime_tz
+from urllib2 import URLError, HTTPError
+
+
+class ConnectionPool(object):
+    """Per-host pool of idle, reusable HTTP(S) connections
+
+    Parameters
+    ----------
+
+    - maxsize: maximum number of idle connections kept per host
+    - idle_timeout: seconds after which an idle connection is discarded
+
+    """
+
+    def __init__(self, maxsize=10, idle_timeout=60):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return an idle connection for key, or None"""
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    return conn
+                conn.close()
+        return None
+
+    def put(self, key, conn):
+        """Return a connection to the pool once its response is consumed"""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def clear(self):
+        """Close and forget all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, last_used in connections:
+                conn.close()
+
+
+class _PooledSocket(object):
+    """Socket-like view of an httplib response used by socket._fileobject.
+
+    The underlying connection goes back to the pool as soon as the body
+    has been read to the end; closing the response early discards it.
+    """
+
+    def __init__(self, response, conn, pool, key):
+        self._response = response
+        self._conn = conn
+        self._pool = pool
+        self._key = key
+        if response.isclosed():
+            self._release()
+
+    def recv(self, amt):
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def close(self):
+        if self._conn is not None:  # body not consumed, connection unusable
+            self._conn.close()
+            self._conn = None
+        self._response.close()
+
+    def _release(self):
+        if self._conn is not None:
+            if self._response.will_close:
+                self._conn.close()
+            else:
+                self._pool.put(self._key, self._conn)
+            self._conn = None
+
+
+class KeepAliveHandlerMixin(object):
+    """Mixin for urllib2 HTTP handlers which reuses pooled connections"""
+
+    def __init__(self, pool, debuglevel=0):
+        self._pool = pool
+        self._debuglevel = debuglevel
+
+    def _pooled_open(self, http_class, req, **http_conn_args):
+        host = req.get_host()
+        if not host:
+            raise URLError('no host given')
+
+        tunnel_host = getattr(req, '_tunnel_host', None)
+        key = (http_class.__name__, host, tunnel_host)
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items()
+                            if k not in headers))
+        headers['Connection'] = 'keep-alive'
+        headers = dict((name.title(), val) for name, val in headers.items())
+
+        tunnel_headers = {}
+        if tunnel_host:
+            proxy_auth_hdr = 'Proxy-Authorization'
+            if proxy_auth_hdr in headers:
+                tunnel_headers[proxy_auth_hdr] = headers.pop(proxy_auth_hdr)
+
+        conn = self._pool.get(key)
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = http_class(host, timeout=req.timeout, **http_conn_args)
+                conn.set_debuglevel(self._debuglevel)
+                if tunnel_host:
+                    conn.set_tunnel(tunnel_host, headers=tunnel_headers)
+            elif req.timeout is not None and conn.sock is not None:
+                conn.sock.settimeout(req.timeout)
+            try:
+                conn.request(req.get_method(), req.get_selector(), req.data, headers)
+                try:
+                    r = conn.getresponse(buffering=True)
+                except TypeError:  # buffering kw not supported
+                    r = conn.getresponse()
+                break
+            except (socket.error, httplib.HTTPException) as err:
+                conn.close()
+                if not reused:
+                    raise URLError(err)
+                # the server dropped an idle connection: retry on a new one
+                conn = None
+                reused = False
+
+        fp = socket._fileobject(_PooledSocket(r, conn, self._pool, key), close=True)
+        resp = urllib2.addinfourl(fp, r.msg, req.get_full_url())
+        resp.code = r.status
+        resp.msg = r.reason
+        return resp
+
+
+class KeepAliveHTTPHandler(KeepAliveHandlerMixin, urllib2.HTTPHandler):
+    def __init__(self, pool, debuglevel=0):
+        urllib2.HTTPHandler.__init__(self, debuglevel)
+        KeepAliveHandlerMixin.__init__(self, pool, debuglevel)
+
+    def http_open(self, req):
+        return self._pooled_open(httplib.HTTPConnection, req)
+
+
+class KeepAliveHTTPSHandler(KeepAliveHandlerMixin, urllib2.HTTPSHandler):
+    def __init__(self, pool, debuglevel=0, context=None):
+        urllib2.HTTPSHandler.__init__(self, debuglevel)
+        KeepAliveHandlerMixin.__init__(self, pool, debuglevel)
+        self._ssl_context = context
+
+    def https_open(self, req):
+        if self._ssl_context is not None:
+            return self._pooled_open(httplib.HTTPSConnection, req,
+                                     context=self._ssl_context)
+        return self._pooled_open(httplib.HTTPSConnection, req)
+
+
+class _DecodedStream(object):
+    """File-like object decompressing a gzip or deflate encoded stream
+    chunk by chunk as it is read"""
+
+    def __init__(self, fp, encoding, chunk_size=16384):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._encoding = encoding
+        if encoding == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._decompressor = zlib.decompressobj()
+        self._first = True
+        # decompressed data not read yet is self._buffer[self._pos:]
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _decompress(self, size=None):
+        """Return the decompressed data of the next chunk (of the whole rest
+        of the stream if size is None), or None at the end"""
+        if self._eof:
+            return None
+        chunk = self._fp.read() if size is None else self._fp.read(size)
+        if not chunk:
+            self._eof = True
+            return self._decompressor.flush()
+        try:
+            data = self._decompressor.decompress(chunk)
+        except zlib.error:
+            if not (self._first and self._encoding == 'deflate'):
+                raise
+            # some servers send raw deflate data without the zlib header
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = self._decompressor.decompress(chunk)
+        self._first = False
+        if size is None:
+            self._eof = True
+            data += self._decompressor.flush()
+        return data
+
+    def _fill_size(self, size):
+        """Decompress chunks until size bytes are buffered or the stream
+        ends; the chunks are joined once"""
+        available = len(self._buffer) - self._pos
+        if available >= size:
+            return
+        parts = [self._buffer[self._pos:]]
+        while available < size:
+            data = self._decompress(self._chunk_size)
+            if data is None:
+                break
+            parts.append(data)
+            available += len(data)
+        self._buffer, self._pos = ''.join(parts), 0
+
+    def _fill_line(self):
+        """Decompress chunks until a line end is buffered or the stream ends"""
+        parts = [self._buffer[self._pos:]]
+        while True:
+            data = self._decompress(self._chunk_size)
+            if data is None:
+                break
+            parts.append(data)
+            if '\n' in data:
+                break
+        self._buffer, self._pos = ''.join(parts), 0
+
+    def _take(self, end):
+        data = self._buffer[self._pos:self._pos + end]
+        self._pos += len(data)
+        if self._pos >= len(self._buffer):
+            self._buffer, self._pos = '', 0
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            parts = [self._buffer[self._pos:]]
+            self._buffer, self._pos = '', 0
+            data = self._decompress()
+            if data is not None:
+                parts.append(data)
+            return ''.join(parts)
+        self._fill_size(size)
+        return self._take(size)
+
+    def readline(self, size=-1):
+        if self._buffer.find('\n', self._pos) < 0:
+            self._fill_line()
+        end = self._buffer.find('\n', self._pos) + 1 - self._pos
+        if end <= 0:
+            end = len(self._buffer) - self._pos
+        if size is not None and size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def readlines(self, sizehint=0):
+        return list(iter(self.readline, ''))
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def close(self):
+        self._fp.close()
+
+
+class DecompressProcessor(urllib2.BaseHandler):
+    """urllib2 processor negotiating gzip/deflate content coding and
+    decoding the responses as they are read"""
+
+    def http_request(self, req):
+        if not req.has_header('Accept-encoding'):
+            req.add_unredirected_header('Accept-Encoding', 'gzip, deflate')
+        return req
+
+    def http_response(self, req, resp):
+        headers = resp.info()
+        encoding = (headers.get('Content-Encoding') or '').strip().lower()
+        if encoding not in ('gzip', 'x-gzip', 'deflate'):
+            return resp
+        del headers['Content-Encoding']
+        if 'Content-Length' in headers:  # length of the encoded body
+            del headers['Content-Length']
+        fp = _DecodedStream(resp, 'deflate' if encoding == 'deflate' else 'gzip')
+        decoded = urllib2.addinfourl(fp, headers, resp.geturl(), resp.getcode())
+        decoded.msg = getattr(resp, 'msg', None)
+        return decoded
+
+    https_request = http_request
+    https_response = http_response
+
+
+class RetryPolicy(object):
+    """Policy for retrying requests which failed for transient reasons
+
+    Parameters
+    ----------
+
+    - max_attempts: total number of attempts, including the first one
+      (default is 3, 1 disables retries)
+    - backoff_factor: the n-th retry waits a random time between 0 and
+      backoff_factor * 2 ** n seconds (default is 0.5)
+    - max_backoff: upper bound of the wait between attempts (default is 30)
+    - jitter: whether to randomize the wait (default is True)
+    - status_codes: HTTP status codes which are retried
+      (default is 429, 502, 503 and 504)
+    - exceptions: exception types which are retried (default is timeouts
+      and broken HTTP responses)
+    - errnos: socket error numbers which are retried (default is
+      connection resets, aborts, broken pipes and timeouts)
+    - methods: HTTP methods which are retried (default is GET and HEAD);
+      POST is not retried unless listed, since a request which timed out
+      may have been processed (e.g. a CSW-T Insert or a WPS Execute) and
+      would be processed again; None retries all methods
+    - max_retry_after: longest Retry-After delay honoured, in seconds
+      (default is 120); the request fails if the server asks for more
+
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30,
+                 jitter=True, status_codes=(429, 502, 503, 504),
+                 exceptions=(socket.timeout, httplib.HTTPException),
+                 errnos=(errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE,
+                         errno.ETIMEDOUT),
+                 methods=('GET', 'HEAD'), max_retry_after=120):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = status_codes
+        self.exceptions = exceptions
+        self.errnos = errnos
+        self.methods = methods
+        self.max_retry_after = max_retry_after
+
+    def allows(self, method):
+        """Return whether requests with the HTTP method may be retried"""
+        return self.methods is None or method.upper() in self.methods
+
+    def is_retryable(self, error, method='GET'):
+        """Return whether a request failing with error may be retried"""
+        if not self.allows(method):
+            return False
+        if isinstance(error, HTTPError):
+            return error.code in self.status_codes
+        if isinstance(error, URLError):
+            error = error.reason
+        if isinstance(error, self.exceptions):
+            return True
+        return isinstance(error, (socket.error, EnvironmentError)) and \
+            getattr(error, 'errno', None) in self.errnos
+
+    def backoff(self, attempt):
+        """Return the number of seconds to wait before retry number attempt"""
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_after(self, error):
+        """Return the delay requested by the Retry-After header of an
+        HTTPError (in seconds or as an HTTP date), or None"""
+        headers = getattr(error, 'hdrs', None)
+        value = headers.get('Retry-After') if headers is not None else None
+        if value is None:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0, mktime_tz(date) - time.time())
+
+    def call(self, func, method='GET'):
+        """Call func until it succeeds, a non retryable error is raised or
+        the attempts are exhausted"""
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except (URLError, socket.error, httplib.HTTPException) as err:
+                attempt += 1
+                if attempt >= self.max_attempts or not self.is_retryable(err, method):
+                    raise
+                delay = self.backoff(attempt - 1)
+                retry_after = self.retry_after(err)
+                if retry_after is not None:
+                    if retry_after > self.max_retry_after:
+                        raise
+                    delay = max(delay, retry_after)
+                if isinstance(err, HTTPError):
+                    err.close()
+                time.sleep(delay)
+
+
+class TokenBucket(object):
+    """Token bucket allowing rate requests per second on average and
+    bursts of up to burst requests"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # tokens may go negative: later callers queue up behind this one
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostLimit(object):
+    """Request rate and concurrency limits applied to one host
+
+    Parameters
+    ----------
+
+    - rate: maximum number of requests per second (None for no limit)
+    - burst: number of requests allowed at once above the rate (default is 1)
+    - max_in_flight: maximum number of concurrent requests (None for no limit);
+      a request is in flight until its response is read to the end or closed
+
+    """
+
+    def __init__(self, rate=None, burst=1, max_in_flight=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._semaphore = None
+        if max_in_flight:
+            self._semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def acquire(self):
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+        if self._bucket is not None:
+            self._bucket.acquire()
+
+    def release(self):
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+class _LimitedResponse(object):
+    """Response wrapper releasing a HostLimit slot once the body has been
+    read to the end or the response is closed"""
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def _done(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def read(self, size=-1):
+        data = self._response.read() if size is None or size < 0 else self._response.read(size)
+        if not data or size is None or size < 0:
+            self._done()
+        return data
+
+    def readline(self, size=-1):
+        line = self._response.readline(size)
+        if not line:
+            self._done()
+        return line
+
+    def readlines(self, sizehint=0):
+        lines = self._response.readlines(sizehint)
+        if not sizehint:
+            self._done()
+        return lines
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def close(self):
+        self._done()
+        self._response.close()
+
+    def __del__(self):
+        self._done()
+
+
+class Session(object):
+    """Connection-pooled HTTP session shared by OWSLib requests
+
+    Parameters
+    ----------
+
+    - maxsize: maximum number of idle connections kept per host (default is 10)
+    - idle_timeout: seconds an idle connection is kept open (default is 60)
+    - handlers: optional list of additional urllib2 handlers (e.g. a ProxyHandler)
+    - ssl_context: optional ssl.SSLContext used for HTTPS connections
+    - retry: RetryPolicy applied to all requests (default is RetryPolicy())
+    - rate, burst, max_in_flight: limits applied to every host (see
+      HostLimit, default is no limit); set_limit overrides them per host
+
+    """
+
+    def __init__(self, maxsize=10, idle_timeout=60, handlers=None, ssl_context=None,
+                 retry=None, rate=None, burst=1, max_in_flight=None):
+        self.pool = ConnectionPool(maxsize=maxsize, idle_timeout=idle_timeout)
+        self.retry = retry if retry is not None else RetryPolicy()
+        self._default_limit = (rate, burst, max_in_flight)
+        self._limits = {}
+        self._limits_lock = threading.Lock()
+        self._passman = urllib2.HTTPPasswordMgrWithDefaultRealm()
+        self._opener = urllib2.build_opener(
+            KeepAliveHTTPHandler(self.pool),
+            KeepAliveHTTPSHandler(self.pool, context=ssl_context),
+            urllib2.HTTPBasicAuthHandler(self._passman),
+            DecompressProcessor(),
+            *(handlers or []))
+
+    @property
+    def maxsize(self):
+        return self.pool.maxsize
+
+    @property
+    def idle_timeout(self):
+        return self.pool.idle_timeout
+
+    def add_password(self, url, username, password):
+        """Register HTTP basic authentication credentials for url.
+
+        The credentials are used for every request of this session below
+        url; do not register them on a session shared by other users
+        (owslib.util.openURL sends per-call credentials with the request
+        instead).
+        """
+        self._passman.add_password(None, url, username, password)
+
+    def set_limit(self, host, rate=None, burst=1, max_in_flight=None):
+        """Limit the requests sent to host (a host name or a URL), see HostLimit"""
+        with self._limits_lock:
+            self._limits[_host(host)] = HostLimit(rate, burst, max_in_flight)
+
+    def get_limit(self, host):
+        """Return the HostLimit applied to host (a host name or a URL), or None"""
+        host = _host(host)
+        with self._limits_lock:
+            limit = self._limits.get(host)
+            if limit is None and any(self._default_limit[i] for i in (0, 2)):
+                limit = self._limits[host] = HostLimit(*self._default_limit)
+            return limit
+
+    def open(self, request, data=None, timeout=30):
+        """Open a URL or urllib2.Request, returning a file-like response.
+
+        Transient failures are retried according to the retry policy, and
+        requests wait for the rate and concurrency limits of their host.
+
+        timeout applies to every attempt: a request which keeps timing out
+        takes up to retry.max_attempts times timeout (plus the backoff
+        delays) before failing.
+        """
+        if isinstance(request, urllib2.Request):
+            method = 'POST' if data is not None else request.get_method()
+            limit = self.get_limit(request.get_host())
+        else:
+            method = 'POST' if data is not None else 'GET'
+            limit = self.get_limit(request)
+
+        def attempt():
+            if limit is None:
+                return self._opener.open(request, data, timeout)
+            limit.acquire()
+            try:
+                response = self._opener.open(request, data, timeout)
+            except:
+                limit.release()
+                raise
+            return _LimitedResponse(response, limit.release)
+
+        return self.retry.call(attempt, method)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.clear()
+
+
+def _host(url):
+    """Return the lower-cased host[:port] of a URL or host name"""
+    if '//' in url:
+        url = urlparse.urlsplit(url).netloc
+    return url.split('@')[-1].lower()
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the default session, creating it on first use"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = Session()
+        return _default_session
+
+
+def set_session(session):
+    """Replace the default session used when none is passed explicitly"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is not None and _default_session is not session:
+            _default_session.close()
+        _default_session = session
+
+
+class AsyncTransport(object):
+    """Thread pool running blocking requests in the background
+
+    Parameters
+    ----------
+
+    - max_workers: number of requests running at the same time (default is 10)
+
+    """
+
+    def __init__(self, max_workers=10):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) on the pool, returning an AsyncResult"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.max_workers)
+            return self._pool.apply_async(func, args, kwargs)
+
+    def close(self):
+        """Wait for the submitted requests and stop the pool"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+_async_transport = None
+_async_transport_lock = threading.Lock()
+
+
+def get_async_transport():
+    """Return the shared async transport, creating it on first use"""
+    global _async_transport
+    with _async_transport_lock:
+        if _async_transport is None:
+            _async_transport = AsyncTransport()
+        return _async_transport
+
+
+def set_async_transport(transport):
+    """Replace the shared async transport"""
+    global _async_transport
+    with _async_transport_lock:
+        previous, _async_transport = _async_transport, transport
+    if previous is not None and previous is not transport:
+        previous.close()
+
+
+def run_async(func, *args, **kwargs):
+    """Submit func(*args, **kwargs) to the shared async transport"""
+    return get_async_transport().submit(func, *args, **kwargs)
@@ -18,8 +18,7 @@ from owslib.etree import etree
 from owslib.namespaces import Namespaces
 import urlparse, urllib2
 from urllib2 import urlopen, HTTPError, Request
-from urllib2 import HTTPPasswordMgrWithDefaultRealm
-from urllib2 import HTTPBasicAuthHandler
+from owslib.transport import get_session
 from StringIO import StringIO
 import cgi
 from urllib import urlencode
@@ -27,6 +26,14 @@ import re
 from copy import deepcopy
 import warnings
 import time
+import threading
+import Queue
+
+# OrderedDict
+try:  # 2.7
+    from collections import OrderedDict
+except:  # 2.6
+    from ordereddict import OrderedDict
 
 
 """
@@ -39,27 +46,117 @@ class RereadableURL(StringIO,object):
         #get url headers etc from url
         self.headers = u.headers                
         #get file like seek, read methods from StringIO
-        content=u.read()
-        #Due to race conditions the XML file might be empty. In that case the parsing method would
-        #throw an exception. This issue can be fixed by requesting the url again and again
-        #until the content is non-empty. To avoid an endless loop a time limit is hardcoded.
-        timelimit = 10.0#sleep for an accumulated maximum of 10 seconds before giving up.
-        timestep = 0.25
-        timecur = 0.0
-        while content == "":
-            page = urllib2.urlopen(u.url)
-            text = page.read()
-            #The header line with <?xml... should not be in content.
-            if "<?xml" == text.strip()[:5]:
-                content = "\n".join(text.split("\n")[1:])
-            else:
-                content = text
-            if timecur > timelimit:
-                break#The parsing with se_tree = etree.fromstring(se_xml) will throw an exception.
-            if content == "":
-                time.sleep(timestep)
-                timecur += timestep
-        super(RereadableURL, self).__init__(content)
+        super(RereadableURL, self).__init__(u.read())
+
+
+class PeekedResponse(object):
+    """File-like view of a url response whose first bytes have already been
+    read: the prefix is replayed before the rest of the live stream.
+
+    Unlike RereadableURL the response is not held in memory, so it is only
+    seekable until something past the prefix has been read: the first seek
+    then reads the rest of the stream into memory.
+    """
+    def __init__(self, u, prefix):
+        self._u = u
+        self.prefix = prefix
+        self._prefix = StringIO(prefix)
+        self._streamed = 0  # bytes read from the live stream
+        self._buffered = False
+        self.headers = u.headers
+        self.url = getattr(u, 'url', None)
+        self.code = getattr(u, 'code', None)
+
+    def _stream(self, data):
+        self._streamed += len(data)
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._prefix.read()
+            if not self._buffered:
+                data += self._stream(self._u.read())
+            return data
+        data = self._prefix.read(size)
+        if len(data) < size and not self._buffered:
+            data += self._stream(self._u.read(size - len(data)))
+        return data
+
+    def readline(self, size=-1):
+        line = self._prefix.readline(size)
+        if not line.endswith('\n') and (size is None or size < 0 or len(line) < size) \
+                and not self._buffered:
+            line += self._stream(self._u.readline(
+                -1 if size is None or size < 0 else size - len(line)))
+        return line
+
+    def seek(self, offset, whence=0):
+        if not self._buffered:
+            if self._streamed:
+                raise IOError('cannot seek a response read past its first %d bytes'
+                              % len(self.prefix))
+            position = self._prefix.tell()
+            self._prefix = StringIO(self.prefix + self._u.read())
+            self._prefix.seek(position)
+            self._buffered = True
+        self._prefix.seek(offset, whence)
+
+    def tell(self):
+        return self._prefix.tell() + self._streamed
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def close(self):
+        self._u.close()
+
+
+# start of the root element of an XML document, after an optional UTF-8 byte
+# order mark and the prolog (DOCTYPE declarations may have an internal subset)
+_ROOT_TAG = re.compile(r'^(?:\xef\xbb\xbf)?\s*'
+                       r'(?:(?:<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>\[]*(?:\[.*?\])?\s*>)\s*)*'
+                       r'<(?:[\w.\-]+:)?([\w.\-]+)', re.S)
+
+_EXCEPTION_ROOTS = ('ExceptionReport', 'ServiceExceptionReport')
+
+
+def sniff_root(u, chunk_size=4096, max_size=65536):
+    """Return (local name of the root element, file-like response).
+
+    Only the start of the response is read, the returned object replays it
+    before the rest of the stream.  The name is None when the response does
+    not look like XML.
+    """
+    prefix = ''
+    while len(prefix) < max_size:
+        chunk = u.read(chunk_size)
+        prefix += chunk
+        match = _ROOT_TAG.match(prefix)
+        if match is not None and match.end() < len(prefix):
+            return match.group(1), PeekedResponse(u, prefix)
+        if not chunk:
+            break
+    return None, PeekedResponse(u, prefix)
+
+
+def service_exception_message(tree):
+    """Return the text of the first exception of an exception report"""
+    for elem in tree.iter():
+        if isinstance(elem.tag, basestring) and \
+                xmltag_split(elem.tag) in ('Exception', 'ServiceException'):
+            texts = [xmltag_split(child.tag) == 'ExceptionText' and child.text
+                     for child in elem if isinstance(child.tag, basestring)]
+            texts = [text.strip() for text in texts if text]
+            if texts:
+                return ' '.join(texts)
+            return str(elem.text).strip()
+    return None
 
 
 class ServiceException(Exception):
@@ -140,8 +237,8 @@ def xml_to_dict(root, prefix=None, depth=1, diction=None):
 
     return ret
 
-def openURL(url_base, data, method='Get', cookies=None, username=None, password=None, timeout=30):
-    ''' function to open urls - wrapper around urllib2.urlopen but with additional checks for OGC service exceptions and url formatting, also handles cookies and simple user password authentication'''
+def openURL(url_base, data, method='Get', cookies=None, username=None, password=None, timeout=30, session=None, headers=None):
+    ''' function to open urls - wrapper around urllib2.urlopen but with additional checks for OGC service exceptions and url formatting, also handles cookies and simple user password authentication.  Requests go through the given owslib.transport.Session (or the default one) so connections are reused'''
     url_base.strip() 
     lastchar = url_base[-1]
     if lastchar not in ['?', '&']:
@@ -149,55 +246,62 @@ def openURL(url_base, data, method='Get', cookies=None, username=None, password=
             url_base = url_base + '?'
         else:
             url_base = url_base + '&'
-            
-    if username and password:
-        # Provide login information in order to use the WMS server
-        # Create an OpenerDirector with support for Basic HTTP 
-        # Authentication...
-        passman = HTTPPasswordMgrWithDefaultRealm()
-        passman.add_password(None, url_base, username, password)
-        auth_handler = HTTPBasicAuthHandler(passman)
-        opener = urllib2.build_opener(auth_handler)
-        openit = opener.open
-    else:
-        # NOTE: optionally set debuglevel>0 to debug HTTP connection
-        #opener = urllib2.build_opener(urllib2.HTTPHandler(debuglevel=0))
-        #openit = opener.open
-        openit = urlopen
+
+    if session is None:
+        session = get_session()
+
+    openit = session.open
    
-    try:
-        if method == 'Post':
-            req = Request(url_base, data)
-            # set appropriate header if posting XML
-            try:
-                xml = etree.fromstring(data)
-                req.add_header('Content-Type', "text/xml")
-            except:
-                pass
-        else:
-            req=Request(url_base + data)
-        if cookies is not None:
-            req.add_header('Cookie', cookies)
-        u = openit(req, timeout=timeout)
-    except HTTPError as e: #Some servers may set the http header to 400 if returning an OGC service exception or 401 if unauthorised.
-        if e.code in [400, 401]:
-            raise ServiceException(e.read())
-        else:
-            raise e
-    # check for service exceptions without the http header set
-    if 'Content-Type' in u.info() and u.info()['Content-Type'] in ['text/xml', 'application/xml']:
-        #just in case 400 headers were not set, going to have to read the xml to see if it's an exception report.
-        #wrap the url stram in a extended StringIO object so it's re-readable
-        u=RereadableURL(u)      
-        se_xml= u.read()
-        se_tree = etree.fromstring(se_xml)
-        serviceException=se_tree.find('{http://www.opengis.net/ows}Exception')
-        if serviceException is None:
-            serviceException=se_tree.find('ServiceException')
-        if serviceException is not None:
-            raise ServiceException(str(serviceException.text).strip())
-        u.seek(0) #return cursor to start of u      
-    return u
+    if method == 'Post':
+        req = Request(url_base, data)
+        # set appropriate header if posting XML
+        try:
+            xml = etree.fromstring(data)
+            req.add_header('Content-Type', "text/xml")
+        except:
+            pass
+    else:
+        req=Request(url_base + data)
+    if username and password:
+        # Provide login information in order to use the WMS server; the
+        # credentials are sent with this request only: they are neither
+        # stored in the (shared) session nor copied to a redirected request,
+        # which may go to another host
+        req.add_unredirected_header('Authorization', 'Basic %s' % base64.b64encode('%s:%s' % (username, password)))
+    if cookies is not None:
+        req.add_header('Cookie', cookies)
+    for name, value in (headers or {}).items():
+        req.add_header(name, value)
+
+    attempt = 0
+    while True:
+        try:
+            u = openit(req, timeout=timeout)
+        except HTTPError as e: #Some servers may set the http header to 400 if returning an OGC service exception or 401 if unauthorised.
+            if e.code in [400, 401]:
+                raise ServiceException(e.read())
+            else:
+                raise e
+        # check for service exceptions without the http header set
+        if 'Content-Type' in u.info() and \
+                u.info()['Content-Type'].split(';')[0].strip() in ['text/xml', 'application/xml']:
+            #just in case 400 headers were not set, sniff the root element to see if it's an
+            #exception report; only that one is read and parsed, other documents are streamed
+            root, u = sniff_root(u)
+            if root in _EXCEPTION_ROOTS:
+                se_xml = u.read()
+                message = service_exception_message(etree.fromstring(se_xml))
+                if message is not None:
+                    raise ServiceException(message)
+                u = PeekedResponse(u, se_xml)
+            elif root is None and u.prefix == "":
+                #the document might be empty due to race conditions, request it again
+                #following the retry policy of the session
+                attempt += 1
+                if attempt < session.retry.max_attempts and session.retry.allows(req.get_method()):
+                    time.sleep(session.retry.backoff(attempt - 1))
+                    continue
+        return u
 
 #default namespace for nspath is OWS common
 OWS_NAMESPACE = 'http://www.opengis.net/ows/1.1'
@@ -218,20 +322,52 @@ def nspath(path, ns=OWS_NAMESPACE):
     if ns is None or path is None:
         return -1
 
+    try:
+        return _nspath_cache[(path, ns)]
+    except KeyError:
+        pass
+
     components = []
     for component in path.split('/'):
         if component != '*':
             component = '{%s}%s' % (ns, component)
         components.append(component)
-    return '/'.join(components)
+    return _cache_path(_nspath_cache, (path, ns), '/'.join(components))
 
 def nspath_eval(xpath, namespaces):
     ''' Return an etree friendly xpath '''
+    cached = _nspath_eval_cache.get(xpath)
+    if cached is not None and _same_namespaces(cached[1], namespaces):
+        return cached[0]
+
     out = []
+    used = []
     for chunks in xpath.split('/'):
         namespace, element = chunks.split(':')
         out.append('{%s}%s' % (namespaces[namespace], element))
-    return '/'.join(out)
+        used.append((namespace, namespaces[namespace]))
+    return _cache_path(_nspath_eval_cache, xpath, ('/'.join(out), tuple(set(used))))[0]
+
+# memoised path expansions, the caches are emptied when they grow too large.
+# The expanded paths are ElementPath expressions for find/findall, which
+# behave the same with lxml and ElementTree (both also cache the compiled
+# ElementPath), so no XPath objects are compiled here.
+PATH_CACHE_SIZE = 4096
+_nspath_cache = {}
+_nspath_eval_cache = {}
+
+def _cache_path(cache, key, value):
+    if len(cache) >= PATH_CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
+
+def _same_namespaces(used, namespaces):
+    ''' Whether namespaces still maps the prefixes of a cached path to the same URIs '''
+    for prefix, uri in used:
+        if namespaces.get(prefix) != uri:
+            return False
+    return True
 
 def cleanup_namespaces(element):
     """ Remove unused namespaces from an element """
@@ -340,7 +476,7 @@ def testXMLAttribute(element, attribute):
 
     return None
 
-def http_post(url=None, request=None, lang='en-US', timeout=10, username=None, password=None):
+def http_post(url=None, request=None, lang='en-US', timeout=10, username=None, password=None, session=None, stream=False):
     """
 
     Invoke an HTTP POST request 
@@ -352,9 +488,14 @@ def http_post(url=None, request=None, lang='en-US', timeout=10, username=None, p
     - request: the request message
     - lang: the language
     - timeout: timeout in seconds
+    - session: owslib.transport.Session to use (default session if None)
+    - stream: return the open response instead of its content (default is False)
 
     """
 
+    if session is None:
+        session = get_session()
+
     if url is not None:
         u = urlparse.urlsplit(url)
         r = urllib2.Request(url, request)
@@ -363,31 +504,18 @@ def http_post(url=None, request=None, lang='en-US', timeout=10, username=None, p
         r.add_header('Content-length', '%d' % len(request))
         r.add_header('Accept', 'text/xml')
         r.add_header('Accept-Language', lang)
-        r.add_header('Accept-Encoding', 'gzip,deflate')
         r.add_header('Host', u.netloc)
 
         if username is not None and password is not None:
             base64string = base64.encodestring('%s:%s' % (username, password))[:-1]
-            r.add_header('Authorization', 'Basic %s' % base64string) 
-        try:
-            up = urllib2.urlopen(r,timeout=timeout);
-        except TypeError:
-            import socket
-            socket.setdefaulttimeout(timeout)
-            up = urllib2.urlopen(r)
-
-        ui = up.info()  # headers
+            r.add_unredirected_header('Authorization', 'Basic %s' % base64string)
+        # gzip/deflate responses are negotiated and decoded by the session
+        up = session.open(r, timeout=timeout)
+        if stream:
+            return up
         response = up.read()
         up.close()
 
-        # check if response is gzip compressed
-        if 'Content-Encoding' in ui:
-            if ui['Content-Encoding'] == 'gzip':  # uncompress response
-                import gzip
-                cds = StringIO(response)
-                gz = gzip.GzipFile(fileobj=cds)
-                response = gz.read()
-
         return response
 
 
@@ -570,6 +698,250 @@ def bind_url(url):
             binder = '&'
     return '%s%s' % (url, binder)
 
+
+class LazyMetadata(object):
+    """Stand-in for a metadata object which is only built when first used
+
+    factory is called without arguments to build the real object the first
+    time an attribute other than the known ones is accessed; the known
+    attributes (passed as keyword arguments, e.g. id, name or index) are
+    available without building it.
+    """
+
+    def __init__(self, factory, **known):
+        self._factory = factory
+        self._metadata = None
+        self.__dict__.update(known)
+
+    def _load(self):
+        if self._metadata is None:
+            self._metadata = self._factory()
+            self._factory = None
+        return self._metadata
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __str__(self):
+        return str(self._load())
+
+
+class OperationTable(object):
+    """Lookup tables of the operations published in a capabilities document
+
+    Built once when the capabilities are parsed, it maps operation names to
+    operation objects and (operation, HTTP method, encoding) to the URL of
+    the request, so that request methods do not scan the operations and
+    their methods on every call.  Operation methods may be lists of dicts
+    with 'type', 'url' and optional 'constraints' (GetEncoding and
+    PostEncoding constraints give the encodings), or dicts of such dicts
+    keyed by type.
+
+    >>> class Operation(object):
+    ...     name = 'GetMap'
+    ...     methods = [{'type': 'Get', 'url': 'http://example.org/wms?'}]
+    >>> table = OperationTable([Operation()])
+    >>> table.operation('GetMap').name, table.url('GetMap', 'get')
+    ('GetMap', 'http://example.org/wms?')
+    >>> table.url('getmap', 'Post', default='http://example.org/wms')
+    'http://example.org/wms'
+
+    """
+
+    def __init__(self, operations):
+        self._operations = {}
+        self._lower = {}
+        self._urls = {}
+        for op in operations:
+            name = getattr(op, 'name', None)
+            if name is None:
+                continue
+            # the first operation of a name wins, as with a linear scan
+            self._operations.setdefault(name, op)
+            self._lower.setdefault(name.lower(), op)
+            methods = getattr(op, 'methods', None) or []
+            if isinstance(methods, dict):
+                methods = [dict(v, type=k) for k, v in methods.items()]
+            for m in methods:
+                url = m.get('url')
+                if url is None or m.get('type') is None:
+                    continue
+                key = (name.lower(), xmltag_split(m['type']).lower())
+                self._urls.setdefault(key + (None,), url)
+                for constraint in m.get('constraints') or []:
+                    # GetEncoding / PostEncoding
+                    if (constraint.name or '').lower().endswith('encoding'):
+                        for value in constraint.values:
+                            if value:
+                                self._urls.setdefault(key + (value.lower(),), url)
+
+    def operation(self, name, case_sensitive=True):
+        """Return the named operation, raising KeyError if there is none"""
+        try:
+            if case_sensitive:
+                return self._operations[name]
+            return self._lower[name.lower()]
+        except KeyError:
+            raise KeyError("No operation named %s" % name)
+
+    def url(self, name, method='Get', encoding=None, default=None):
+        """Return the URL of an operation for an HTTP method.
+
+        The URL of the first method matching the encoding (e.g. 'XML' for
+        POST requests) is returned, or the URL of the first method of that
+        type, or default.
+        """
+        key = (name.lower(), xmltag_split(method).lower())
+        if encoding is not None:
+            url = self._urls.get(key + (encoding.lower(),))
+            if url is not None:
+                return url
+        return self._urls.get(key + (None,), default)
+
+    def __contains__(self, name):
+        return name in self._operations
+
+
+_STOP = object()
+
+
+def iter_concurrently(func, iterable, max_workers=4):
+    """Apply func to every item of iterable using a pool of threads
+
+    Yields (item, result, error) tuples in completion order.  error is None
+    when func succeeded, otherwise it is the exception raised by func and
+    result is None.  Items are pulled from iterable lazily so that at most
+    2 * max_workers of them are in flight at any time; leaving the loop
+    early discards the items which have not been started.
+
+    Parameters
+    ----------
+
+    - func: callable taking a single item
+    - iterable: items to process
+    - max_workers: number of worker threads (default is 4)
+
+    >>> sorted(r for i, r, e in iter_concurrently(abs, [-1, 2, -3]))
+    [1, 2, 3]
+
+    """
+    max_workers = max(1, int(max_workers))
+    tasks = Queue.Queue()
+    results = Queue.Queue()
+
+    def worker():
+        while True:
+            item = tasks.get()
+            if item is _STOP:
+                return
+            try:
+                results.put((item, func(item), None))
+            except Exception as err:
+                results.put((item, None, err))
+
+    threads = []
+    for i in range(max_workers):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    pending = 0
+    try:
+        for item in iterable:
+            tasks.put(item)
+            pending += 1
+            if pending >= 2 * max_workers:
+                yield results.get()
+                pending -= 1
+        while pending:
+            yield results.get()
+            pending -= 1
+    finally:
+        try:
+            while True:
+                tasks.get_nowait()
+        except Queue.Empty:
+            pass
+        for thread in threads:
+            tasks.put(_STOP)
+
+
+# parsed remote metadata documents and the time they were fetched, keyed by
+# (parser, url, type), least recently used first
+_remote_metadata_cache = OrderedDict()
+_remote_metadata_lock = threading.Lock()
+REMOTE_METADATA_CACHE_SIZE = 512
+REMOTE_METADATA_CACHE_TTL = 3600  # seconds, None never expires
+
+
+def _cached_remote_metadata(key):
+    """Return (True, metadata) if key is cached and fresh, (False, None) otherwise"""
+    with _remote_metadata_lock:
+        entry = _remote_metadata_cache.pop(key, None)
+        if entry is None:
+            return False, None
+        if REMOTE_METADATA_CACHE_TTL is not None and \
+                time.time() - entry[1] > REMOTE_METADATA_CACHE_TTL:
+            return False, None
+        _remote_metadata_cache[key] = entry
+        return True, entry[0]
+
+
+def _cache_remote_metadata(key, metadata):
+    with _remote_metadata_lock:
+        _remote_metadata_cache.pop(key, None)
+        while len(_remote_metadata_cache) >= REMOTE_METADATA_CACHE_SIZE:
+            _remote_metadata_cache.popitem(last=False)
+        _remote_metadata_cache[key] = (metadata, time.time())
+
+
+def resolve_remote_metadata(metadata_urls, parse, max_workers=4, timeout=30,
+                            session=None):
+    """Fetch and parse the documents referenced by MetadataURL entries
+
+    metadata_urls is a list of the metadataUrl dicts built by the
+    ContentMetadata classes (with 'url' and 'type' keys).  Each distinct
+    URL is downloaded once, over a pool of max_workers threads, and
+    parse(metadataUrl, doc) turns the etree document into a metadata object
+    (or None if the type is not supported) stored under the 'metadata' key.
+    'metadata' is set to None when the download or the parsing fails.
+
+    Parsed objects are cached per URL across calls for
+    REMOTE_METADATA_CACHE_TTL seconds, keeping the REMOTE_METADATA_CACHE_SIZE
+    most recently used ones; every metadataUrl gets its own copy of the
+    cached object.  Failed downloads are not cached.
+    """
+    pending = {}
+    for metadata_url in metadata_urls:
+        if metadata_url.get('url') is None:
+            continue
+        key = (parse, metadata_url['url'], metadata_url['type'])
+        cached, metadata = _cached_remote_metadata(key)
+        if cached:
+            if metadata is not None:
+                metadata_url['metadata'] = deepcopy(metadata)
+        else:
+            pending.setdefault(key, []).append(metadata_url)
+
+    def fetch(key):
+        content = (session or get_session()).open(key[1], timeout=timeout)
+        return parse(pending[key][0], etree.parse(content))
+
+    for key, metadata, error in iter_concurrently(fetch, list(pending),
+                                                  max_workers):
+        if error is not None:
+            log.debug('Remote metadata %s: %s' % (key[1], error))
+            for metadata_url in pending[key]:
+                metadata_url['metadata'] = None
+            continue
+        _cache_remote_metadata(key, metadata)
+        if metadata is not None:
+            for metadata_url in pending[key]:
+                metadata_url['metadata'] = deepcopy(metadata)
+
 import logging
 # Null logging handler
 try:
@@ -583,10 +955,4 @@ except AttributeError:
 log = logging.getLogger('owslib')
 log.addHandler(NullHandler())
 
-# OrderedDict
-try:  # 2.7
-    from collections import OrderedDict
-except:  # 2.6
-    from ordereddict import OrderedDict
-
 
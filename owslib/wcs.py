@@ -17,27 +17,29 @@ from __future__ import (absolute_import, division, print_function)
 
 import urllib2
 from . import etree
+from .transport import get_session
+from .cache import read_capabilities
 from .coverage import wcs100, wcs110, wcsBase
 
 
-def WebCoverageService(url, version=None, xml=None, cookies=None, timeout=30):
+def WebCoverageService(url, version=None, xml=None, cookies=None, timeout=30, session=None):
     ''' wcs factory function, returns a version specific WebCoverageService object '''
     
     if version is None:
         if xml is None:
             reader = wcsBase.WCSCapabilitiesReader()
             request = reader.capabilities_url(url)
-            if cookies is None:
-                xml = urllib2.urlopen(request, timeout=timeout).read()
-            else:
-                req = urllib2.Request(request)
-                req.add_header('Cookie', cookies)   
-                xml=urllib2.urlopen(req, timeout=timeout)
+            def opener(headers):
+                req = urllib2.Request(request, headers=headers)
+                if cookies is not None:
+                    req.add_header('Cookie', cookies)
+                return (session or get_session()).open(req, timeout=timeout)
+            xml = read_capabilities(request, opener)
         capabilities = etree.etree.fromstring(xml)
         version = capabilities.get('version')
         del capabilities
         
     if version == '1.0.0':
-        return wcs100.WebCoverageService_1_0_0.__new__(wcs100.WebCoverageService_1_0_0, url, xml, cookies)
+        return wcs100.WebCoverageService_1_0_0.__new__(wcs100.WebCoverageService_1_0_0, url, xml, cookies, session)
     elif version == '1.1.0':
-        return wcs110.WebCoverageService_1_1_0.__new__(wcs110.WebCoverageService_1_1_0,url, xml, cookies)
+        return wcs110.WebCoverageService_1_1_0.__new__(wcs110.WebCoverageService_1_1_0,url, xml, cookies, session)
@@ -19,7 +19,7 @@ from .feature import wfs100, wfs110, wfs200
 
 
 def WebFeatureService(url, version='1.0.0', xml=None, parse_remote_metadata=False,
-                      timeout=30):
+                      timeout=30, session=None):
     ''' wfs factory function, returns a version specific WebFeatureService object
     
     @type url: string
@@ -29,15 +29,17 @@ def WebFeatureService(url, version='1.0.0', xml=None, parse_remote_metadata=Fals
     @type parse_remote_metadata: boolean
     @param parse_remote_metadata: whether to fully process MetadataURL elements
     @param timeout: time (in seconds) after which requests should timeout
+    @type session: owslib.transport.Session
+    @param session: HTTP session used for all requests (default session if None)
     @return: initialized WebFeatureService_2_0_0 object
     '''
     if version in  ['1.0', '1.0.0']:
         return wfs100.WebFeatureService_1_0_0(url, version, xml, parse_remote_metadata, 
-                                              timeout=timeout)
+                                              timeout=timeout, session=session)
     elif version in  ['1.1', '1.1.0']:
         return wfs110.WebFeatureService_1_1_0(url, version, xml, parse_remote_metadata,
-                                              timeout=timeout)
+                                              timeout=timeout, session=session)
     elif version in ['2.0', '2.0.0']:
         return wfs200.WebFeatureService_2_0_0(url,  version, xml, parse_remote_metadata,
-                                              timeout=timeout)
+                                              timeout=timeout, session=session)
 
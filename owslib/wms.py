@@ -19,13 +19,30 @@ from __future__ import (absolute_import, division, print_function)
 
 import cgi
 import urllib2
+from StringIO import StringIO
 from urllib import urlencode
 import warnings
 from .etree import etree
-from .util import openURL, testXMLValue, extract_xml_list, xmltag_split
+from .util import openURL, testXMLValue, extract_xml_list, xmltag_split, LazyMetadata, \
+    resolve_remote_metadata, OperationTable, iter_concurrently
+from .cache import read_capabilities, get_capabilities_cache
+from .transport import run_async
 from .fgdc import Metadata
 from .iso import MD_Metadata
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# tile size used by getmap_tiled when the service advertises no maximum
+DEFAULT_TILE_SIZE = 2048
+
 
 class ServiceException(Exception):
     """WMS ServiceException
@@ -62,20 +79,37 @@ class WebMapService(object):
 
     
     def __init__(self, url, version='1.1.1', xml=None, 
-                username=None, password=None, parse_remote_metadata=False
+                username=None, password=None, parse_remote_metadata=False,
+                session=None, streaming=False, lazy=False
                 ):
-        """Initialize."""
+        """Initialize.
+
+        With streaming=True the capabilities document is parsed
+        incrementally: each Layer is turned into ContentMetadata as soon
+        as it is complete and its elements are then discarded, which keeps
+        the memory use low for services with very many layers.  In that
+        case getServiceXML returns the document without its layers.
+
+        With lazy=True (and streaming=False) contents holds lightweight
+        proxies which only parse their Layer element when an attribute
+        other than id, name, index, parent or layers is first accessed.
+        """
         self.url = url
         self.username = username
         self.password = password
         self.version = version
+        self.session = session
         self._capabilities = None
         
         # Authentication handled by Reader
         reader = WMSCapabilitiesReader(
-                self.version, url=self.url, un=self.username, pw=self.password
+                self.version, url=self.url, un=self.username, pw=self.password,
+                session=self.session
                 )
-        if xml:  # read from stored xml
+        layers = None
+        if streaming:
+            self._capabilities, layers = reader.readIncremental(self.url, xml)
+        elif xml:  # read from stored xml
             self._capabilities = reader.readString(xml)
         else:  # read from server
             self._capabilities = reader.read(self.url)
@@ -87,18 +121,24 @@ class WebMapService(object):
             raise ServiceException(err_message, xml) 
 
         # build metadata objects
-        self._buildMetadata(parse_remote_metadata)
+        self._buildMetadata(parse_remote_metadata, layers, lazy)
 
     def _getcapproperty(self):
         if not self._capabilities:
             reader = WMSCapabilitiesReader(
-                self.version, url=self.url, un=self.username, pw=self.password
+                self.version, url=self.url, un=self.username, pw=self.password,
+                session=self.session
                 )
             self._capabilities = ServiceMetadata(reader.read(self.url))
         return self._capabilities
 
-    def _buildMetadata(self, parse_remote_metadata=False):
-        ''' set up capabilities metadata objects '''
+    def _buildMetadata(self, parse_remote_metadata=False, layers=None, lazy=False):
+        ''' set up capabilities metadata objects
+
+        layers is the list of ContentMetadata already built by an
+        incremental parse, if any.  With lazy, layers are only parsed
+        on first use.
+        '''
         
         #serviceIdentification metadata
         serviceelem=self._capabilities.find('Service')
@@ -111,6 +151,7 @@ class WebMapService(object):
         self.operations=[]
         for elem in self._capabilities.find('Capability/Request')[:]:
             self.operations.append(OperationMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
           
         #serviceContents metadata: our assumption is that services use a top-level 
         #layer as a metadata organizer, nothing more.
@@ -121,13 +162,55 @@ class WebMapService(object):
         #To the WebMapService.contents store only metadata of named layers.
         def gather_layers(parent_elem, parent_metadata):
             for index, elem in enumerate(parent_elem.findall('Layer')):
-                cm = ContentMetadata(elem, parent=parent_metadata, index=index+1, parse_remote_metadata=parse_remote_metadata)
-                if cm.id:
-                    if cm.id in self.contents:
-                        warnings.warn('Content metadata for layer "%s" already exists. Using child layer' % cm.id)
-                    self.contents[cm.id] = cm
+                if lazy:
+                    cm = lazy_layer(elem, parent_metadata, index+1)
+                    if parent_metadata is not None:
+                        parent_metadata.layers.append(cm)
+                else:
+                    cm = ContentMetadata(elem, parent=parent_metadata, index=index+1)
+                all_layers.append(cm)
+                add_layer(cm)
                 gather_layers(elem, cm)
-        gather_layers(caps, None)
+
+        def lazy_layer(elem, parent, index):
+            name = testXMLValue(elem.find('Name'))
+            children = []
+            def factory():
+                cm = ContentMetadata(elem, parent=parent, index=index,
+                                     children=children)
+                # the remote metadata of lazy layers is fetched on first use
+                if parse_remote_metadata:
+                    resolve_remote_metadata(cm.metadataUrls, _parse_remote_metadata,
+                                            max_workers=1, session=self.session)
+                return cm
+            if parent:
+                full_index = "%s.%d" % (parent.index, index)
+            else:
+                full_index = str(index)
+            return LazyMetadata(factory, id=name, name=name, index=full_index,
+                                parent=parent, layers=children)
+
+        def add_layer(cm):
+            if cm.id:
+                if cm.id in self.contents:
+                    warnings.warn('Content metadata for layer "%s" already exists. Using child layer' % cm.id)
+                self.contents[cm.id] = cm
+
+        if layers is None:
+            all_layers = []
+            gather_layers(caps, None)
+        else:
+            all_layers = layers
+            for cm in layers:
+                add_layer(cm)
+
+        # fetch the remote metadata of all layers at once (lazy layers
+        # fetch their own when they are built)
+        if parse_remote_metadata:
+            resolve_remote_metadata(
+                [m for cm in all_layers if not isinstance(cm, LazyMetadata)
+                 for m in cm.metadataUrls],
+                _parse_remote_metadata, session=self.session)
         
         #exceptions
         self.exceptions = [f.text for f \
@@ -146,7 +229,8 @@ class WebMapService(object):
         NOTE: this is effectively redundant now"""
         
         reader = WMSCapabilitiesReader(
-            self.version, url=self.url, un=self.username, pw=self.password
+            self.version, url=self.url, un=self.username, pw=self.password,
+            session=self.session
             )
         u = self._open(reader.capabilities_url(self.url))
         # check for service exceptions, and return
@@ -205,10 +289,7 @@ class WebMapService(object):
             >>> out.close()
 
         """        
-        try:
-            base_url = next((m.get('url') for m in self.getOperationByName('GetMap').methods if m.get('type').lower() == method.lower()))
-        except StopIteration:
-            base_url = self.url
+        base_url = self._operation_table.url('GetMap', method, default=self.url)
         request = {'version': self.version, 'request': 'GetMap'}
         
         # check layers and styles
@@ -240,7 +321,8 @@ class WebMapService(object):
 
         data = urlencode(request)
         
-        u = openURL(base_url, data, method, username = self.username, password = self.password)
+        u = openURL(base_url, data, method, username = self.username, password = self.password,
+                    session = self.session)
 
         # check for service exceptions, and return
         if u.info()['Content-Type'] == 'application/vnd.ogc.se_xml':
@@ -250,6 +332,89 @@ class WebMapService(object):
             raise ServiceException(err_message, se_xml)
         return u
         
+    def getmap_async(self, *args, **kwargs):
+        """Run getmap in the background, returning a multiprocessing.pool.AsyncResult"""
+        return run_async(self.getmap, *args, **kwargs)
+
+    def getmap_tiled(self, layers=None, styles=None, srs=None, bbox=None,
+                     format=None, size=None, tilesize=None, max_workers=4,
+                     array=False, transparent=False, **kwargs):
+        """Request an image larger than the service allows in tiles.
+
+        bbox and size are split into a grid of GetMap requests of at most
+        tilesize pixels, which are fetched concurrently and mosaicked in
+        memory.  Tiles never exceed the MaxWidth/MaxHeight advertised by the
+        service.  Requires PIL (Pillow); returns a PIL Image, or a numpy
+        array when array is True.
+
+        Parameters
+        ----------
+        layers, styles, srs, bbox, format, size, transparent, **kwargs
+            As for getmap.
+        tilesize : tuple
+            Optional (width, height) of the tiles in pixels (default is the
+            advertised MaxWidth/MaxHeight, or DEFAULT_TILE_SIZE).
+        max_workers : int
+            Maximum number of concurrent requests (default is 4).
+        array : bool
+            Optional. Return a numpy array instead of an Image.
+
+        Example
+        -------
+            >>> img = wms.getmap_tiled(layers=['nexrad-n0r'], srs='EPSG:4326',  # doctest: +SKIP
+            ...                        bbox=(-126, 24, -66, 50), size=(12000, 5200),
+            ...                        format='image/png')
+            >>> img.save('nexrad.png')  # doctest: +SKIP
+
+        """
+        if Image is None:
+            raise ImportError('getmap_tiled requires PIL (Pillow)')
+        if array and np is None:
+            raise ImportError('getmap_tiled(array=True) requires numpy')
+
+        width, height = int(size[0]), int(size[1])
+        tilewidth, tileheight = tilesize or (DEFAULT_TILE_SIZE, DEFAULT_TILE_SIZE)
+        if self.identification.maxwidth:
+            tilewidth = min(tilewidth, self.identification.maxwidth)
+        if self.identification.maxheight:
+            tileheight = min(tileheight, self.identification.maxheight)
+
+        minx, miny, maxx, maxy = [float(v) for v in bbox]
+        resx = (maxx - minx) / width
+        resy = (maxy - miny) / height
+
+        def fetch(tile):
+            x, y, w, h = tile
+            # pixel rows are counted from the top of the image
+            tilebbox = (minx + x * resx, maxy - (y + h) * resy,
+                        minx + (x + w) * resx, maxy - y * resy)
+            if x + w == width:
+                tilebbox = tilebbox[:2] + (maxx, tilebbox[3])
+            if y + h == height:
+                tilebbox = (tilebbox[0], miny) + tilebbox[2:]
+            u = self.getmap(layers=layers, styles=styles, srs=srs,
+                            bbox=tilebbox, format=format, size=(w, h),
+                            transparent=transparent, **kwargs)
+            img = Image.open(StringIO(u.read()))
+            img.load()
+            return img
+
+        mode = 'RGBA' if transparent else 'RGB'
+        mosaic = Image.new(mode, (width, height))
+        tiles = [(x, y, min(tilewidth, width - x), min(tileheight, height - y))
+                 for y in range(0, height, tileheight)
+                 for x in range(0, width, tilewidth)]
+        for tile, img, error in iter_concurrently(fetch, tiles, max_workers):
+            if error is not None:
+                raise error
+            if img.mode != mode:
+                img = img.convert(mode)
+            mosaic.paste(img, tile[:2])
+
+        if array:
+            return np.asarray(mosaic)
+        return mosaic
+
     def getServiceXML(self):
         xml = None
         if self._capabilities is not None:
@@ -261,10 +426,7 @@ class WebMapService(object):
 
     def getOperationByName(self, name): 
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
     
 class ServiceIdentification(object):
     ''' Implements IServiceIdentificationMetadata '''
@@ -278,6 +440,14 @@ class ServiceIdentification(object):
         self.keywords = extract_xml_list(self._root.findall('KeywordList/Keyword'))
         self.accessconstraints = testXMLValue(self._root.find('AccessConstraints'))
         self.fees = testXMLValue(self._root.find('Fees'))
+        # maximum image size accepted by GetMap, if advertised
+        self.maxwidth = self.maxheight = None
+        val = testXMLValue(self._root.find('MaxWidth'))
+        if val is not None and val.isdigit():
+            self.maxwidth = int(val)
+        val = testXMLValue(self._root.find('MaxHeight'))
+        if val is not None and val.isdigit():
+            self.maxheight = int(val)
 
 class ServiceProvider(object):
     ''' Implements IServiceProviderMetatdata '''
@@ -317,8 +487,12 @@ class ContentMetadata:
     Abstraction for WMS layer metadata.
 
     Implements IContentMetadata.
+
+    Child layers are parsed from elem unless the list of child
+    ContentMetadata is passed as children (used by incremental parsing).
     """
-    def __init__(self, elem, parent=None, index=0, parse_remote_metadata=False, timeout=30):
+    def __init__(self, elem, parent=None, index=0, parse_remote_metadata=False, timeout=30,
+                 children=None):
         if elem.tag != 'Layer':
             raise ValueError('%s should be a Layer' % (elem,))
         
@@ -479,20 +653,12 @@ class ContentMetadata:
                 'url': testXMLValue(m.find('OnlineResource').attrib['{http://www.w3.org/1999/xlink}href'], attrib=True)
             }
 
-            if metadataUrl['url'] is not None and parse_remote_metadata:  # download URL
-                try:
-                    content = urllib2.urlopen(metadataUrl['url'], timeout=timeout)
-                    doc = etree.parse(content)
-                    if metadataUrl['type'] is not None:
-                        if metadataUrl['type'] == 'FGDC':
-                            metadataUrl['metadata'] = Metadata(doc)
-                        if metadataUrl['type'] == 'TC211':
-                            metadataUrl['metadata'] = MD_Metadata(doc)
-                except Exception:
-                    metadataUrl['metadata'] = None
-
             self.metadataUrls.append(metadataUrl)
 
+        if parse_remote_metadata:  # download URLs
+            resolve_remote_metadata(self.metadataUrls, _parse_remote_metadata,
+                                    max_workers=1, timeout=timeout)
+
         # DataURLs
         self.dataUrls = []
         for m in elem.findall('DataURL'):
@@ -502,14 +668,25 @@ class ContentMetadata:
             }
             self.dataUrls.append(dataUrl)
                 
-        self.layers = []
-        for child in elem.findall('Layer'):
-            self.layers.append(ContentMetadata(child, self))
+        if children is not None:
+            self.layers = children
+        else:
+            self.layers = []
+            for child in elem.findall('Layer'):
+                self.layers.append(ContentMetadata(child, self))
 
     def __str__(self):
         return 'Layer Name: %s Title: %s' % (self.name, self.title)
 
 
+def _parse_remote_metadata(metadataUrl, doc):
+    """Return the metadata object for a remote MetadataURL document"""
+    if metadataUrl['type'] == 'FGDC':
+        return Metadata(doc)
+    if metadataUrl['type'] == 'TC211':
+        return MD_Metadata(doc)
+
+
 class OperationMetadata:
     """Abstraction for WMS OperationMetadata.
     
@@ -573,13 +750,14 @@ class WMSCapabilitiesReader:
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='1.1.1', url=None, un=None, pw=None):
+    def __init__(self, version='1.1.1', url=None, un=None, pw=None, session=None):
         """Initialize"""
         self.version = version
         self._infoset = None
         self.url = url
         self.username = un
         self.password = pw
+        self.session = session
 
         #if self.username and self.password:
             ## Provide login information in order to use the WMS server
@@ -617,12 +795,88 @@ class WMSCapabilitiesReader:
         service_url is the base url, to which is appended the service,
         version, and request parameters
         """
+        return etree.fromstring(self._fetch(service_url))
+
+    def _fetch(self, service_url, stream=False):
+        """Return the capabilities document of service_url as a string, or
+        as a file-like object with stream (the open response unless the
+        document goes through the capabilities cache)"""
         getcaprequest = self.capabilities_url(service_url)
 
         #now split it up again to use the generic openURL function...
         spliturl=getcaprequest.split('?')
-        u = openURL(spliturl[0], spliturl[1], method='Get', username = self.username, password = self.password)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return openURL(spliturl[0], spliturl[1], method='Get', username = self.username, password = self.password,
+                           session = self.session, headers = headers)
+        if stream:
+            if get_capabilities_cache() is None:
+                return opener({})
+            return StringIO(read_capabilities(getcaprequest, opener, self.username))
+        return read_capabilities(getcaprequest, opener, self.username)
+
+    def readIncremental(self, service_url=None, xml=None):
+        """Incrementally parse a WMS capabilities document
+
+        The document is xml if given, otherwise it is fetched from
+        service_url and parsed while it is downloaded.  Each Layer becomes a ContentMetadata as soon as it
+        is known (a parent when its first child Layer starts, a leaf when
+        it ends) and its elements are removed from the tree afterwards.
+
+        Returns (infoset, layers): the elementtree root stripped of its
+        Layer elements, and the ContentMetadata of all layers in document
+        order.
+        """
+        if xml is None:
+            source = self._fetch(service_url, stream=True)
+        elif isinstance(xml, str):
+            source = StringIO(xml)
+        else:
+            raise ValueError("String must be of type string, not %s" % type(xml))
+
+        root = None
+        elems = []  # currently open elements
+        stack = []  # [elem, metadata, index, child count] of open layers
+        layers = []
+        toplevel = [0]
+
+        def build(entry, parent):
+            if entry[1] is None:
+                entry[1] = ContentMetadata(entry[0], parent=parent and parent[1],
+                                           index=entry[2], children=[])
+                layers.append(entry[1])
+            return entry[1]
+
+        try:
+            for event, elem in etree.iterparse(source, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                    elems.append(elem)
+                    if elem.tag == 'Layer':
+                        if stack:
+                            # the parent properties all precede the child layers
+                            build(stack[-1], stack[-2] if len(stack) > 1 else None)
+                            stack[-1][3] += 1
+                            index = stack[-1][3]
+                        else:
+                            toplevel[0] += 1
+                            index = toplevel[0]
+                        stack.append([elem, None, index, 0])
+                    continue
+
+                elems.pop()
+                if elem.tag != 'Layer':
+                    continue
+                entry = stack.pop()
+                cm = build(entry, stack[-1] if stack else None)
+                if stack:
+                    stack[-1][1].layers.append(cm)
+                elem.clear()
+                if elems:
+                    elems[-1].remove(elem)
+        finally:
+            source.close()
+        return root, layers
 
     def readString(self, st):
         """Parse a WMS capabilities document, returning an elementtree instance
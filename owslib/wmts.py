@@ -31,15 +31,24 @@ would be appreciated.
 
 from __future__ import (absolute_import, division, print_function)
 
+import math
 import warnings
 import urlparse
 import urllib2
 from urllib import urlencode
 from .etree import etree
-from .util import openURL, testXMLValue, getXMLInteger
+from .util import openURL, testXMLValue, getXMLInteger, iter_concurrently, LazyMetadata, OperationTable
 from .fgdc import Metadata
 from .iso import MD_Metadata
 from .ows import ServiceProvider, ServiceIdentification, OperationsMetadata
+from .crs import Crs
+from .cache import read_capabilities
+from .transport import run_async
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 _OWS_NS = '{http://www.opengis.net/ows/1.1}'
@@ -85,6 +94,26 @@ _TOP_LEFT_CORNER_TAG = _WMTS_NS + 'TopLeftCorner'
 
 _HREF_TAG = _XLINK_NS + 'href'
 
+# WMTS 1.0.0, 6.1: standardized rendering pixel size of 0.28mm
+_PIXEL_SIZE = 0.00028
+# meters per unit for CRSs in degrees (6378137 * 2 * pi / 360)
+_METERS_PER_DEGREE = 111319.49079327358
+# OWSLib has no CRS definitions, so the unit of measure of a CRS is only
+# known for the codes below; TileMatrix refuses to guess for other codes.
+# CRS codes whose unit of measure is the degree
+_GEOGRAPHIC_CRS_CODES = frozenset([
+    4326, 4258, 4267, 4269, 4283, 4617, 4979,
+    'CRS84', 'CRS83', 'CRS27'])
+# CRS codes whose unit of measure is the meter: web and world mercator,
+# geocentric WGS 84, common national grids and the WGS 84 / ETRS89 UTM zones
+_METRIC_CRS_CODES = frozenset(
+    [3857, 3785, 900913, 102100, 102113, 3395, 4978, 3035, 2154, 2056,
+     21781, 27700, 28992, 31466, 31467, 31468, 31469] +
+    list(range(25828, 25839)) + list(range(32601, 32661)) +
+    list(range(32701, 32761)))
+# tolerance (in tiles) absorbing rounding errors at tile boundaries
+_TILE_EPSILON = 1e-9
+
 
 class ServiceException(Exception):
     """WMTS ServiceException
@@ -122,7 +151,8 @@ class WebMapTileService(object):
 
     def __init__(self, url, version='1.0.0', xml=None, username=None,
                  password=None, parse_remote_metadata=False,
-                 vendor_kwargs=None):
+                 vendor_kwargs=None, session=None, tile_cache=None,
+                 lazy=False):
         """Initialize.
 
         Parameters
@@ -143,6 +173,16 @@ class WebMapTileService(object):
         vendor_kwargs : dict
             Optional vendor-specific parameters to be included in all
             requests.
+        session : owslib.transport.Session
+            Optional HTTP session to share pooled connections with other
+            services. Defaults to the owslib default session.
+        tile_cache : owslib.cache.TileCache
+            Optional persistent tile store used by gettile and gettiles.
+            Requests with vendor-specific parameters bypass the store.
+        lazy : bool
+            If True, contents holds lightweight proxies which only parse
+            their Layer element when an attribute other than id, name,
+            index, parent or layers is first accessed.
 
         """
         self.url = url
@@ -150,11 +190,14 @@ class WebMapTileService(object):
         self.password = password
         self.version = version
         self.vendor_kwargs = vendor_kwargs
+        self.session = session
+        self.tile_cache = tile_cache
         self._capabilities = None
 
         # Authentication handled by Reader
         reader = WMTSCapabilitiesReader(self.version, url=self.url,
-                                        un=self.username, pw=self.password)
+                                        un=self.username, pw=self.password,
+                                        session=self.session)
 
         if xml:  # read from stored xml
             self._capabilities = reader.readString(xml)
@@ -170,18 +213,19 @@ class WebMapTileService(object):
             raise ServiceException(err_message, xml)
 
         # build metadata objects
-        self._buildMetadata(parse_remote_metadata)
+        self._buildMetadata(parse_remote_metadata, lazy)
 
     def _getcapproperty(self):
         if not self._capabilities:
             reader = WMTSCapabilitiesReader(
-                self.version, url=self.url, un=self.username, pw=self.password
+                self.version, url=self.url, un=self.username, pw=self.password,
+                session=self.session
                 )
             xml = reader.read(self.url, self.vendor_kwargs)
             self._capabilities = ServiceMetadata(xml)
         return self._capabilities
 
-    def _buildMetadata(self, parse_remote_metadata=False):
+    def _buildMetadata(self, parse_remote_metadata=False, lazy=False):
         ''' set up capabilities metadata objects '''
 
         # serviceIdentification metadata
@@ -196,17 +240,40 @@ class WebMapTileService(object):
         self.operations = []
         for elem in self._capabilities.find(_OPERATIONS_METADATA_TAG)[:]:
             self.operations.append(OperationsMetadata(elem))
+        self._operation_table = OperationTable(self.operations)
 
         # serviceContents metadata: our assumption is that services use
         # a top-level layer as a metadata organizer, nothing more.
         self.contents = {}
         caps = self._capabilities.find(_CONTENTS_TAG)
 
+        def lazy_layer(elem, parent, index):
+            name = testXMLValue(elem.find(_IDENTIFIER_TAG))
+            children = []
+
+            def factory():
+                return ContentMetadata(
+                    elem, parent=parent, index=index,
+                    parse_remote_metadata=parse_remote_metadata,
+                    children=children)
+            if parent:
+                full_index = "%s.%d" % (parent.index, index)
+            else:
+                full_index = str(index)
+            return LazyMetadata(factory, id=name, name=name,
+                                index=full_index, parent=parent,
+                                layers=children)
+
         def gather_layers(parent_elem, parent_metadata):
             for index, elem in enumerate(parent_elem.findall(_LAYER_TAG)):
-                cm = ContentMetadata(
-                    elem, parent=parent_metadata, index=index+1,
-                    parse_remote_metadata=parse_remote_metadata)
+                if lazy:
+                    cm = lazy_layer(elem, parent_metadata, index+1)
+                    if parent_metadata is not None:
+                        parent_metadata.layers.append(cm)
+                else:
+                    cm = ContentMetadata(
+                        elem, parent=parent_metadata, index=index+1,
+                        parse_remote_metadata=parse_remote_metadata)
                 if cm.id:
                     if cm.id in self.contents:
                         raise KeyError('Content metadata for layer "%s" '
@@ -374,31 +441,17 @@ TILEMATRIX=6&TILEROW=4&TILECOL=4&FORMAT=image%2Fjpeg'
         """
         vendor_kwargs = self.vendor_kwargs or {}
         vendor_kwargs.update(kwargs)
+        if layer is not None:
+            style, format, tilematrixset = self._tile_defaults(
+                layer, style, format, tilematrixset)
         data = self.buildTileRequest(layer, style, format, tilematrixset,
                                      tilematrix, row, column, **vendor_kwargs)
 
         if base_url is None:
-            base_url = self.url
-            try:
-                get_verbs = filter(
-                    lambda x: x.get('type').lower() == 'get',
-                    self.getOperationByName('GetTile').methods)
-                if len(get_verbs) > 1:
-                    # Filter by constraints
-                    base_url = next(
-                        x for x in filter(
-                            list,
-                            ([pv.get('url')
-                                for const in pv.get('constraints')
-                                if 'kvp' in map(
-                                    lambda x: x.lower(), const.values)]
-                             for pv in get_verbs if pv.get('constraints'))))[0]
-                elif len(get_verbs) == 1:
-                    base_url = get_verbs[0].get('url')
-            except StopIteration:
-                pass
-        u = openURL(base_url, data, username=self.username,
-                    password=self.password)
+            base_url = self._gettile_base_url()
+        u = self._opentile(base_url, data, (layer, style, tilematrixset,
+                                            tilematrix, row, column, format),
+                           cacheable=not vendor_kwargs)
 
         # check for service exceptions, and return
         if u.info()['Content-Type'] == 'application/vnd.ogc.se_xml':
@@ -408,6 +461,113 @@ TILEMATRIX=6&TILEROW=4&TILECOL=4&FORMAT=image%2Fjpeg'
             raise ServiceException(err_message.strip(), se_xml)
         return u
 
+    def gettile_async(self, *args, **kwargs):
+        """Run gettile in the background, returning a multiprocessing.pool.AsyncResult"""
+        return run_async(self.gettile, *args, **kwargs)
+
+    def gettiles(self, layer=None, tilematrixset=None, tilematrix=None,
+                 rows=None, cols=None, style=None, format=None,
+                 base_url=None, max_workers=4, **kwargs):
+        """Fetch many tiles of one tile matrix concurrently.
+
+        Requests are spread over a pool of at most max_workers threads
+        sharing the connection pool of the service session.  Yields
+        (row, col, data) tuples in completion order, where data is the
+        tile image as a string, or the exception raised while fetching
+        that tile (e.g. a ServiceException or urllib2.HTTPError).
+
+        Parameters
+        ----------
+        layer : string
+            Content layer name.
+        tilematrixset : string
+            Optional name of tile matrix set to use.
+            Defaults to the first tile matrix set defined for the
+            relevant layer in the GetCapabilities response.
+        tilematrix : string
+            Name of the tile matrix to use.
+        rows : iterable of integers
+            Row indices of the tiles to request.
+        cols : iterable of integers
+            Column indices of the tiles to request. Every combination of
+            rows and cols is fetched.
+        style, format, base_url, **kwargs
+            As for gettile.
+        max_workers : integer
+            Maximum number of concurrent requests (default is 4).
+
+        Example
+        -------
+            >>> url = 'http://map1c.vis.earthdata.nasa.gov/wmts-geo/wmts.cgi'
+            >>> wmts = WebMapTileService(url)  # doctest: +SKIP
+            >>> for row, col, img in wmts.gettiles(  # doctest: +SKIP
+            ...         layer='VIIRS_CityLights_2012',
+            ...         tilematrixset='EPSG4326_500m', tilematrix='6',
+            ...         rows=range(4, 8), cols=range(4, 8)):
+            ...     if not isinstance(img, Exception):
+            ...         open('tile_%d_%d.jpg' % (row, col), 'wb').write(img)
+
+        """
+        if layer is None:
+            raise ValueError("layer is mandatory (cannot be None)")
+        # resolve the per-layer defaults and the endpoint once for all tiles
+        style, format, tilematrixset = self._tile_defaults(
+            layer, style, format, tilematrixset)
+        if base_url is None:
+            base_url = self._gettile_base_url()
+        vendor_kwargs = dict(self.vendor_kwargs or {})
+        vendor_kwargs.update(kwargs)
+        cols = list(cols or [])
+
+        def fetch(tile):
+            data = self.buildTileRequest(layer, style, format, tilematrixset,
+                                         tilematrix, tile[0], tile[1],
+                                         **vendor_kwargs)
+            u = self._opentile(base_url, data,
+                               (layer, style, tilematrixset, tilematrix,
+                                tile[0], tile[1], format),
+                               cacheable=not vendor_kwargs)
+            content = u.read()
+            if u.info()['Content-Type'] == 'application/vnd.ogc.se_xml':
+                se_tree = etree.fromstring(content)
+                err_message = unicode(se_tree.find('ServiceException').text)
+                raise ServiceException(err_message.strip(), content)
+            return content
+
+        tiles = ((row, col) for row in rows or [] for col in cols)
+        for tile, content, error in iter_concurrently(fetch, tiles,
+                                                      max_workers):
+            yield tile[0], tile[1], content if error is None else error
+
+    def _tile_defaults(self, layer, style, format, tilematrixset):
+        """Return (style, format, tilematrixset), defaulting to the first
+        ones declared for layer in the GetCapabilities response."""
+        if style is None:
+            style = self[layer].styles.keys()[0]
+        if format is None:
+            format = self[layer].formats[0]
+        if tilematrixset is None:
+            tilematrixset = sorted(self[layer].tilematrixsetlinks.keys())[0]
+        return style, format, tilematrixset
+
+    def _opentile(self, base_url, data, key, cacheable=True):
+        """Open a GetTile request, through the tile cache if any.
+
+        key is (layer, style, tilematrixset, tilematrix, row, column,
+        format); the service URL is prepended to form the cache key.
+        """
+        def opener(headers):
+            return openURL(base_url, data, username=self.username,
+                           password=self.password, session=self.session,
+                           headers=headers)
+        if self.tile_cache is None or not cacheable:
+            return opener(None)
+        return self.tile_cache.fetch((self.url,) + tuple(key), opener)
+
+    def _gettile_base_url(self):
+        """Return the KVP GetTile URL declared in the capabilities."""
+        return self._operation_table.url('GetTile', 'Get', 'KVP', default=self.url)
+
     def getServiceXML(self):
         xml = None
         if self._capabilities is not None:
@@ -419,10 +579,7 @@ TILEMATRIX=6&TILEROW=4&TILECOL=4&FORMAT=image%2Fjpeg'
 
     def getOperationByName(self, name):
         """Return a named content item."""
-        for item in self.operations:
-            if item.name == name:
-                return item
-        raise KeyError("No operation named %s" % name)
+        return self._operation_table.operation(name)
 
 
 class TileMatrixSet(object):
@@ -434,19 +591,51 @@ class TileMatrixSet(object):
         self.crs = testXMLValue(elem.find(_SUPPORTED_CRS_TAG)).strip()
         if self.crs is None or self.identifier is None:
             raise ValueError('%s incomplete TileMatrixSet' % (elem,))
+        try:
+            crs = Crs(self.crs)
+        except ValueError:
+            crs = None
         self.tilematrix = {}
         for tilematrix in elem.findall(_TILE_MATRIX_TAG):
-            tm = TileMatrix(tilematrix)
+            tm = TileMatrix(tilematrix, crs)
             if tm.identifier:
                 if tm.identifier in self.tilematrix:
                     raise KeyError('TileMatrix with identifier "%s" '
                                    'already exists' % tm.identifier)
                 self.tilematrix[tm.identifier] = tm
 
+    def tile_ranges(self, bbox, tilematrixlimits=None):
+        """Return the tile range covering bbox for every TileMatrix.
+
+        bbox is (minx, miny, maxx, maxy) in easting/northing order.
+        tilematrixlimits is an optional dict of TileMatrixLimits keyed
+        by TileMatrix identifier, typically the tilematrixlimits of the
+        layer's TileMatrixSetLink.  Returns a dict mapping the TileMatrix
+        identifier to (minrow, maxrow, mincol, maxcol), or to None when
+        bbox does not intersect that TileMatrix.
+        """
+        tilematrixlimits = tilematrixlimits or {}
+        ranges = {}
+        for identifier, tm in self.tilematrix.items():
+            ranges[identifier] = tm.tile_range(
+                bbox, tilematrixlimits.get(identifier))
+        return ranges
+
 
 class TileMatrix(object):
-    '''Holds one TileMatrix'''
-    def __init__(self, elem):
+    '''Holds one TileMatrix
+
+    Besides the values parsed from the capabilities, the geometry of the
+    matrix is available: resolution (CRS units per pixel), tilespanx and
+    tilespany (CRS units per tile), origin (the top left corner in
+    easting/northing order) and extent (minx, miny, maxx, maxy).
+
+    The scale denominator is converted to CRS units with metersperunit,
+    which is only known for the degree and meter CRS codes listed in this
+    module.  For any other CRS metersperunit is None and the geometry
+    raises ValueError until metersperunit is set by the caller.
+    '''
+    def __init__(self, elem, crs=None):
         if elem.tag != _TILE_MATRIX_TAG:
             raise ValueError('%s should be a TileMatrix' % (elem,))
         self.identifier = testXMLValue(elem.find(_IDENTIFIER_TAG)).strip()
@@ -474,6 +663,122 @@ class TileMatrix(object):
         self.matrixwidth = int(mw)
         self.matrixheight = int(mh)
 
+        self.crs = crs
+        if crs is not None and crs.code in _GEOGRAPHIC_CRS_CODES:
+            self.metersperunit = _METERS_PER_DEGREE
+        elif crs is not None and crs.code in _METRIC_CRS_CODES:
+            self.metersperunit = 1.0
+        else:
+            self.metersperunit = None
+        if crs is not None and crs.axisorder == 'yx':
+            self.origin = (self.topleftcorner[1], self.topleftcorner[0])
+        else:
+            self.origin = self.topleftcorner
+
+    @property
+    def resolution(self):
+        if self.metersperunit is None:
+            raise ValueError('unit of measure of %s is unknown, set the '
+                             'metersperunit of TileMatrix %s' %
+                             (self.crs and self.crs.getcode(),
+                              self.identifier))
+        return self.scaledenominator * _PIXEL_SIZE / self.metersperunit
+
+    @property
+    def tilespanx(self):
+        return self.tilewidth * self.resolution
+
+    @property
+    def tilespany(self):
+        return self.tileheight * self.resolution
+
+    @property
+    def extent(self):
+        return (self.origin[0],
+                self.origin[1] - self.matrixheight * self.tilespany,
+                self.origin[0] + self.matrixwidth * self.tilespanx,
+                self.origin[1])
+
+    def _bounds(self, limits):
+        """Return (minrow, maxrow, mincol, maxcol) allowed by limits"""
+        bounds = [0, self.matrixheight - 1, 0, self.matrixwidth - 1]
+        if limits is not None:
+            for i, value in enumerate((limits.mintilerow, limits.maxtilerow,
+                                       limits.mintilecol, limits.maxtilecol)):
+                if value is not None:
+                    bounds[i] = max(bounds[i], value) if i % 2 == 0 \
+                        else min(bounds[i], value)
+        return bounds
+
+    def tile_range(self, bbox, limits=None):
+        """Return the range of tiles intersecting bbox.
+
+        bbox is (minx, miny, maxx, maxy) in easting/northing order, and
+        limits an optional TileMatrixLimits restricting the result.
+        Returns (minrow, maxrow, mincol, maxcol), bounds included, or None
+        when bbox lies outside the matrix.
+        """
+        minx, miny, maxx, maxy = bbox
+        x0, y0 = self.origin
+        mincol = int(math.floor((minx - x0) / self.tilespanx + _TILE_EPSILON))
+        maxcol = int(math.ceil((maxx - x0) / self.tilespanx - _TILE_EPSILON)) - 1
+        minrow = int(math.floor((y0 - maxy) / self.tilespany + _TILE_EPSILON))
+        maxrow = int(math.ceil((y0 - miny) / self.tilespany - _TILE_EPSILON)) - 1
+        # degenerate (point or line) boxes still touch one tile
+        maxcol = max(mincol, maxcol)
+        maxrow = max(minrow, maxrow)
+
+        lowrow, highrow, lowcol, highcol = self._bounds(limits)
+        minrow, maxrow = max(minrow, lowrow), min(maxrow, highrow)
+        mincol, maxcol = max(mincol, lowcol), min(maxcol, highcol)
+        if minrow > maxrow or mincol > maxcol:
+            return None
+        return (minrow, maxrow, mincol, maxcol)
+
+    def tile_bbox(self, row, col):
+        """Return the (minx, miny, maxx, maxy) extent of a tile"""
+        x0, y0 = self.origin
+        return (x0 + col * self.tilespanx,
+                y0 - (row + 1) * self.tilespany,
+                x0 + (col + 1) * self.tilespanx,
+                y0 - row * self.tilespany)
+
+    def tile_indices(self, x, y, limits=None):
+        """Return the (rows, cols) of the tiles containing points.
+
+        x and y are sequences (or arrays) of eastings and northings.
+        Points outside the matrix, or outside the optional
+        TileMatrixLimits, get row and column -1.  When numpy is
+        available the computation is vectorised and numpy integer
+        arrays are returned, otherwise lists.
+        """
+        lowrow, highrow, lowcol, highcol = self._bounds(limits)
+        x0, y0 = self.origin
+        if np is not None:
+            x = np.asarray(x, dtype=float)
+            y = np.asarray(y, dtype=float)
+            cols = np.floor((x - x0) / self.tilespanx + _TILE_EPSILON)
+            rows = np.floor((y0 - y) / self.tilespany + _TILE_EPSILON)
+            cols = cols.astype(np.int64)
+            rows = rows.astype(np.int64)
+            outside = ((rows < lowrow) | (rows > highrow) |
+                       (cols < lowcol) | (cols > highcol))
+            rows[outside] = -1
+            cols[outside] = -1
+            return rows, cols
+
+        rows, cols = [], []
+        for px, py in zip(x, y):
+            col = int(math.floor((px - x0) / self.tilespanx + _TILE_EPSILON))
+            row = int(math.floor((y0 - py) / self.tilespany + _TILE_EPSILON))
+            if lowrow <= row <= highrow and lowcol <= col <= highcol:
+                rows.append(row)
+                cols.append(col)
+            else:
+                rows.append(-1)
+                cols.append(-1)
+        return rows, cols
+
 
 class Theme:
     """
@@ -597,7 +902,7 @@ class ContentMetadata:
     Implements IContentMetadata.
     """
     def __init__(self, elem, parent=None, index=0,
-                 parse_remote_metadata=False):
+                 parse_remote_metadata=False, children=None):
         if elem.tag != _LAYER_TAG:
             raise ValueError('%s should be a Layer' % (elem,))
 
@@ -668,9 +973,12 @@ class ContentMetadata:
 
         self.infoformats = [f.text for f in elem.findall(_INFO_FORMAT_TAG)]
 
-        self.layers = []
-        for child in elem.findall(_LAYER_TAG):
-            self.layers.append(ContentMetadata(child, self))
+        if children is not None:
+            self.layers = children
+        else:
+            self.layers = []
+            for child in elem.findall(_LAYER_TAG):
+                self.layers.append(ContentMetadata(child, self))
 
     @property
     def tilematrixsets(self):
@@ -690,13 +998,15 @@ class WMTSCapabilitiesReader:
     """Read and parse capabilities document into a lxml.etree infoset
     """
 
-    def __init__(self, version='1.0.0', url=None, un=None, pw=None):
+    def __init__(self, version='1.0.0', url=None, un=None, pw=None,
+                 session=None):
         """Initialize"""
         self.version = version
         self._infoset = None
         self.url = url
         self.username = un
         self.password = pw
+        self.session = session
 
     def capabilities_url(self, service_url, vendor_kwargs=None):
         """Return a capabilities url
@@ -731,9 +1041,11 @@ class WMTSCapabilitiesReader:
 
         # now split it up again to use the generic openURL function...
         spliturl = getcaprequest.split('?')
-        u = openURL(spliturl[0], spliturl[1], method='Get',
-                    username=self.username, password=self.password)
-        return etree.fromstring(u.read())
+        def opener(headers):
+            return openURL(spliturl[0], spliturl[1], method='Get',
+                           username=self.username, password=self.password,
+                           session=self.session, headers=headers)
+        return etree.fromstring(read_capabilities(getcaprequest, opener, self.username))
 
     def readString(self, st):
         """Parse a WMTS capabilities document, returning an elementtree instance
@@ -93,6 +93,8 @@ from owslib.util import (testXMLValue, build_get_url, dump, getTypedValue,
                   getNamespace, element_to_string, nspath, openURL, nspath_eval, log)
 from xml.dom.minidom import parseString
 from owslib.namespaces import Namespaces
+from owslib.cache import read_capabilities
+from owslib.transport import run_async
 
 # namespace definition
 n = Namespaces()
@@ -160,11 +162,13 @@ class WebProcessingService(object):
     Implements IWebProcessingService.
     """
     
-    def __init__(self, url, version=WPS_DEFAULT_VERSION, username=None, password=None, verbose=False, skip_caps=False):
+    def __init__(self, url, version=WPS_DEFAULT_VERSION, username=None, password=None, verbose=False, skip_caps=False,
+                 session=None):
         """
         Initialization method resets the object status.
         By default it will execute a GetCapabilities invocation to the remote service, 
         which can be skipped by using skip_caps=True.
+        An owslib.transport.Session may be passed to share pooled connections.
         """
         
         # fields passed in from object initializer
@@ -173,6 +177,7 @@ class WebProcessingService(object):
         self.password = password
         self.version = version
         self.verbose = verbose
+        self.session = session
                 
         # fields populated by method invocations
         self._capabilities = None
@@ -191,7 +196,7 @@ class WebProcessingService(object):
         """
         
         # read capabilities document
-        reader = WPSCapabilitiesReader(version=self.version, verbose=self.verbose)
+        reader = WPSCapabilitiesReader(version=self.version, verbose=self.verbose, session=self.session)
         if xml:
             # read from stored XML file
             self._capabilities = reader.readFromString(xml)
@@ -210,7 +215,7 @@ class WebProcessingService(object):
         """
         
         # read capabilities document
-        reader = WPSDescribeProcessReader(version=self.version, verbose=self.verbose)
+        reader = WPSDescribeProcessReader(version=self.version, verbose=self.verbose, session=self.session)
         if xml:
             # read from stored XML file
             rootElement = reader.readFromString(xml)
@@ -237,7 +242,8 @@ class WebProcessingService(object):
         
         # instantiate a WPSExecution object
         log.info('Executing WPS request...')
-        execution = WPSExecution(version=self.version, url=self.url, username=self.username, password=self.password, verbose=self.verbose)
+        execution = WPSExecution(version=self.version, url=self.url, username=self.username, password=self.password, verbose=self.verbose,
+                                 session=self.session)
 
         # build XML request from parameters 
         if request is None:
@@ -258,7 +264,12 @@ class WebProcessingService(object):
         execution.parseResponse(response)
                         
         return execution
-    
+
+    def execute_async(self, *args, **kwargs):
+        """
+        Submits execute in the background, returning a multiprocessing.pool.AsyncResult whose result is the WPSExecution object.
+        """
+        return run_async(self.execute, *args, **kwargs)
         
     def _parseProcessMetadata(self, rootElement):
         """
@@ -342,9 +353,10 @@ class WPSReader(object):
     Superclass for reading a WPS document into a lxml.etree infoset.
     """
 
-    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False):        
+    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False, session=None):
         self.version = version
         self.verbose = verbose
+        self.session = session
                 
     def _readFromUrl(self, url, data, method='Get', username=None, password=None):
         """
@@ -361,12 +373,14 @@ class WPSReader(object):
     
             # split URL into base url and query string to use utility function
             spliturl=request_url.split('?')
-            u = openURL(spliturl[0], spliturl[1], method='Get', username=username, password=password)
-            return etree.fromstring(u.read())
+            u = openURL(spliturl[0], spliturl[1], method='Get', username=username, password=password,
+                        session=self.session)
+            return etree.parse(u).getroot()
         
         elif method == 'Post':
-            u = openURL(url, data, method='Post', username = username, password = password)
-            return etree.fromstring(u.read())
+            u = openURL(url, data, method='Post', username = username, password = password,
+                        session = self.session)
+            return etree.parse(u).getroot()
             
         else:
             raise Exception("Unrecognized HTTP method: %s" % method)
@@ -386,9 +400,9 @@ class WPSCapabilitiesReader(WPSReader):
     Utility class that reads and parses a WPS GetCapabilities document into a lxml.etree infoset.
     """
     
-    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False):
+    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False, session=None):
         # superclass initializer
-        super(WPSCapabilitiesReader,self).__init__(version=version, verbose=verbose)
+        super(WPSCapabilitiesReader,self).__init__(version=version, verbose=verbose, session=session)
         
     def readFromUrl(self, url, username=None, password=None):
         """
@@ -396,18 +410,21 @@ class WPSCapabilitiesReader(WPSReader):
         url: WPS service base url, to which is appended the HTTP parameters: service, version, and request.
         username, password: optional user credentials
         """
-        return self._readFromUrl(url, 
-                                 {'service':'WPS', 'request':'GetCapabilities', 'version':self.version}, 
-                                 username=username, password=password)
+        request_url = build_get_url(url, {'service':'WPS', 'request':'GetCapabilities', 'version':self.version})
+        spliturl = request_url.split('?')
+        def opener(headers):
+            return openURL(spliturl[0], spliturl[1], method='Get', username=username, password=password,
+                           session=self.session, headers=headers)
+        return etree.fromstring(read_capabilities(request_url, opener, username))
             
 class WPSDescribeProcessReader(WPSReader):
     """
     Class that reads and parses a WPS DescribeProcess document into a etree infoset
     """
 
-    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False):
+    def __init__(self, version=WPS_DEFAULT_VERSION, verbose=False, session=None):
         # superclass initializer
-        super(WPSDescribeProcessReader,self).__init__(version=version, verbose=verbose)
+        super(WPSDescribeProcessReader,self).__init__(version=version, verbose=verbose, session=session)
 
                 
     def readFromUrl(self, url, identifier, username=None, password=None):
@@ -424,9 +441,9 @@ class WPSExecuteReader(WPSReader):
     """
     Class that reads and parses a WPS Execute response document into a etree infoset
     """
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, session=None):
         # superclass initializer
-        super(WPSExecuteReader,self).__init__(verbose=verbose)
+        super(WPSExecuteReader,self).__init__(verbose=verbose, session=session)
         
     def readFromUrl(self, url, data={}, method='Get', username=None, password=None):
          """
@@ -442,7 +459,8 @@ class WPSExecution():
     Class that represents a single WPS process executed on a remote WPS service.
     """
     
-    def __init__(self, version=WPS_DEFAULT_VERSION, url=None, username=None, password=None, verbose=False):
+    def __init__(self, version=WPS_DEFAULT_VERSION, url=None, username=None, password=None, verbose=False,
+                 session=None):
         
         # initialize fields
         self.url = url
@@ -450,6 +468,7 @@ class WPSExecution():
         self.username = username
         self.password = password
         self.verbose = verbose
+        self.session = session
         
         # request document
         self.request = None
@@ -574,7 +593,7 @@ class WPSExecution():
         sleepSecs: number of seconds to sleep before returning control to the caller.
         """
                     
-        reader = WPSExecuteReader(verbose=self.verbose)
+        reader = WPSExecuteReader(verbose=self.verbose, session=self.session)
         if response is None:
             # override status location
             if url is not None:
@@ -665,7 +684,7 @@ class WPSExecution():
         """ 
         
         self.request = request
-        reader = WPSExecuteReader(verbose=self.verbose)
+        reader = WPSExecuteReader(verbose=self.verbose, session=self.session)
         response = reader.readFromUrl(self.url, request, method='Post', username=self.username, password=self.password)
         self.response = response
         return response